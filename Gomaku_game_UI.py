@@ -1,20 +1,35 @@
-import pygame
-import numpy as np
-import math
 import time
-import tkinter as tk
-from tkinter import messagebox
+import threading
 
+from gomoku.constants import EMPTY, WHITE, BLACK
+from gomoku.game import Game, SearchTimeout
+from gomoku.records import save_game
 
-# Constants
-EMPTY = 0
-WHITE = 1  # AI
-BLACK = 2  # Human
+# pygame and tkinter are imported by load_gui() when the UI starts, so this
+# module (and the engine it uses) can be imported without a display
+pygame = None
+tk = None
+messagebox = None
+
+
+def load_gui():
+    global pygame, tk, messagebox
+    import pygame
+    import tkinter as tk
+    from tkinter import messagebox
 
+
+# Constants
 CELL_SIZE = 40
 MARGIN = 20
 LINE_WIDTH = 1
 FPS = 60
+# status bar under the board: thinking indicator, search progress, key help
+STATUS_HEIGHT = 40
+# an AI move is shown no sooner than this after its search started (ms)
+MOVE_PAUSE = 300
+# larger boards are shown through a scrollable window of this many cells
+VIEW = 19
 
 # Colors
 BG_COLOR = (245, 222, 179)  # Light wood
@@ -22,174 +37,192 @@ GRID_COLOR = (0, 0, 0)
 BLACK_COLOR = (0, 0, 0)
 WHITE_COLOR = (255, 255, 255)
 
-# Game logic (Your Game class)
-class Game:
-    def __init__(self, size=15):
-        self.matrix = np.zeros((size, size), dtype=int)
-        self.size = size
-
-    def is_winner(self, color):
-        return (self.check_row_win(color) or
-                self.check_col_win(color) or
-                self.check_diagonal_win(color))
-
-    def is_draw(self):
-        return not np.any(self.matrix == EMPTY)
-
-    def check_row_win(self, color):
-        for i in range(self.size):
-            for j in range(self.size - 4):
-                if np.array_equal(self.matrix[i, j:j + 5], np.full(5, color)):
-                    return True
-        return False
-
-    def check_col_win(self, color):
-        for j in range(self.size):
-            for i in range(self.size - 4):
-                if np.array_equal(self.matrix[i:i + 5, j], np.full(5, color)):
-                    return True
-        return False
-
-    def check_diagonal_win(self, color):
-        for i in range(self.size - 4):
-            for j in range(self.size - 4):
-                if all(self.matrix[i + k, j + k] == color for k in range(5)):
-                    return True
-                if all(self.matrix[i + 4 - k, j + k] == color for k in range(5)):
-                    return True
-        return False
-
-    def get_all_valid_moves(self):
-        return [(i, j) for i in range(self.size) for j in range(self.size) if self.matrix[i, j] == EMPTY]
-
-    def heuristic_sort_moves(self, moves):
-        def count_neighbors(move):
-            x, y = move
-            count = 0
-            for i in [-1, 0, 1]:
-                for j in [-1, 0, 1]:
-                    if 0 <= x+i < self.size and 0 <= y+j < self.size:
-                        if self.matrix[x+i][y+j] != EMPTY:
-                            count += 1
-            return count
-        return sorted(moves, key=count_neighbors, reverse=True)
-
-    def minimax(self, depth, is_maximizing):
-        if self.is_winner(WHITE):
-            return 10
-        elif self.is_winner(BLACK):
-            return -10
-        elif self.is_draw() or depth == 0:
-            return 0
-
-        if is_maximizing:
-            best_score = -math.inf
-            moves = self.get_all_valid_moves()
-            moves = self.heuristic_sort_moves(moves)
-            for i, j in moves:
-                self.matrix[i, j] = WHITE
-                score = self.minimax(depth - 1, False)
-                self.matrix[i, j] = EMPTY
-                best_score = max(score, best_score)
-            return best_score
-        else:
-            best_score = math.inf
-            moves = self.get_all_valid_moves()
-            moves = self.heuristic_sort_moves(moves)
-            for i, j in moves:
-                self.matrix[i, j] = BLACK
-                score = self.minimax(depth - 1, True)
-                self.matrix[i, j] = EMPTY
-                best_score = min(score, best_score)
-            return best_score
-
-    def alpha_beta_minimax(self, alpha, beta, depth, color, is_maximizing):
-        opponent = BLACK if color == WHITE else WHITE
-        if self.is_winner(color):
-            return 10000
-        elif self.is_winner(opponent):
-            return -10000
-        elif depth == 0 or self.is_draw():
-            return 0
-
-        if is_maximizing:
-            best_score = -math.inf
-            moves = self.get_all_valid_moves()
-            moves = self.heuristic_sort_moves(moves)
-            for i, j in moves:
-                self.matrix[i, j] = color
-                score = self.alpha_beta_minimax(alpha, beta, depth - 1, opponent, False)
-                self.matrix[i, j] = EMPTY
-                alpha = max(alpha, score)
-                if beta <= alpha:
-                    break
-                best_score = max(score, best_score)
-            return best_score
-        else:
-            best_score = math.inf
-            moves = self.get_all_valid_moves()
-            moves = self.heuristic_sort_moves(moves)
-            for i, j in moves:
-                self.matrix[i, j] = opponent
-                score = self.alpha_beta_minimax(alpha, beta, depth - 1, color, True)
-                self.matrix[i, j] = EMPTY
-                beta = min(beta, score)
-                if beta <= alpha:
-                    break
-                best_score = min(score, best_score)
-            return best_score
-
-    def ai_move(self, ai_type="minimax", color=WHITE):
-        best_score = -math.inf
-        best_move = None
-        moves= self.get_all_valid_moves()
-        moves=self.heuristic_sort_moves(moves)
-        
-        for i, j in moves:
-            self.matrix[i, j] = color
-            score = (
-                self.minimax(2, False) if ai_type == "minimax"
-                else self.alpha_beta_minimax(-math.inf, math.inf, 2, color, False)
-            )
-            self.matrix[i, j] = EMPTY
-            if score > best_score:
-                best_score = score
-                best_move = (i, j)
-        if best_move:
-            self.matrix[best_move[0], best_move[1]] = color
-            return best_move
+class AISearch:
+    """ai_move on a copy of the game in a background thread.
+
+    The UI keeps drawing and handling events while the search runs, reads
+    its progress from the copy and applies the move once done is set.
+    force() ends the search with the best move found so far; cancel() ends
+    it and marks the result to be thrown away.
+    """
+
+    def __init__(self, game, ai_type, color, time_limit):
+        # the copy shares the game's search tables, which the UI leaves alone
+        # until the search is done
+        self.game = game.search_copy()
+        self.plies = len(self.game.history)
+        self.color = color
+        self.move = None
+        self.done = False
+        self.cancelled = False
+        self.start = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, args=(ai_type, time_limit), daemon=True)
+        self.thread.start()
+
+    def run(self, ai_type, time_limit):
+        try:
+            self.move = self.game.ai_move(ai_type=ai_type, color=self.color, time_limit=time_limit)
+        except SearchTimeout:
+            # a fixed-depth search stopped by force(): play the best-ordered move
+            while len(self.game.history) > self.plies:
+                self.game.undo_move()
+            moves = self.game.order_moves(self.game.get_all_valid_moves(), self.color)
+            self.move = moves[0] if moves else None
+        self.done = True
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def force(self):
+        self.game.stop = True
+
+    def cancel(self):
+        self.cancelled = True
+        self.game.stop = True
+
+    def status(self):
+        dots = "." * (int(self.elapsed * 2) % 4)
+        text = f"Thinking{dots:<3} {self.elapsed:4.1f}s  {self.game.nodes:,} nodes"
+        if self.game.progress is not None:
+            depth, move = self.game.progress
+            text += f"  d{depth} {move}"
+        return text
 
 # PyGame GUI logic
-def draw_board(screen, game):
-    screen.fill(BG_COLOR)
-    for i in range(game.size):
-        pygame.draw.line(screen, GRID_COLOR,
-                         (MARGIN, MARGIN + i * CELL_SIZE),
-                         (MARGIN + (game.size - 1) * CELL_SIZE, MARGIN + i * CELL_SIZE), LINE_WIDTH)
-        pygame.draw.line(screen, GRID_COLOR,
-                         (MARGIN + i * CELL_SIZE, MARGIN),
-                         (MARGIN + i * CELL_SIZE, MARGIN + (game.size - 1) * CELL_SIZE), LINE_WIDTH)
-
-    for r in range(game.size):
-        for c in range(game.size):
-            if game.matrix[r, c] == BLACK:
-                pygame.draw.circle(screen, BLACK_COLOR,
-                                   (MARGIN + c * CELL_SIZE, MARGIN + r * CELL_SIZE), CELL_SIZE // 3)
-            elif game.matrix[r, c] == WHITE:
-                pygame.draw.circle(screen, WHITE_COLOR,
-                                   (MARGIN + c * CELL_SIZE, MARGIN + r * CELL_SIZE), CELL_SIZE // 3)
-
-def get_cell_from_mouse(pos, size):
-    x, y = pos
-    col = round((x - MARGIN) / CELL_SIZE)
-    row = round((y - MARGIN) / CELL_SIZE)
-    if 0 <= row < size and 0 <= col < size:
-        return row, col
-    return None
+class BoardRenderer:
+    """Draws the board incrementally, updating only the changed rectangles.
+
+    The background and grid are rendered once into a surface. A new stone is
+    drawn on top of it, and a taken-back stone is erased by copying that cell
+    back from the background. The status bar is redrawn only when its text
+    changes. flush() passes just those rectangles to pygame.display.update,
+    so an idle frame costs next to nothing.
+
+    Boards larger than VIEW cells (50x50 and unbounded sparse boards) are
+    shown through a window of VIEW x VIEW cells whose top left cell is
+    (top, left); scroll() and show() move it and repaint.
+    """
+
+    def __init__(self, screen, size, font):
+        self.screen = screen
+        self.size = size
+        self.view = min(size, VIEW)
+        # a large board opens on its center, where the first move goes
+        self.top = self.left = (size - self.view) // 2
+        self.font = font
+        self.board_height = screen.get_height() - STATUS_HEIGHT
+        self.background = pygame.Surface(screen.get_size())
+        self.background.fill(BG_COLOR)
+        view = self.view
+        for i in range(view):
+            pygame.draw.line(self.background, GRID_COLOR,
+                             (MARGIN, MARGIN + i * CELL_SIZE),
+                             (MARGIN + (view - 1) * CELL_SIZE, MARGIN + i * CELL_SIZE), LINE_WIDTH)
+            pygame.draw.line(self.background, GRID_COLOR,
+                             (MARGIN + i * CELL_SIZE, MARGIN),
+                             (MARGIN + i * CELL_SIZE, MARGIN + (view - 1) * CELL_SIZE), LINE_WIDTH)
+        # stones on screen as (row, col, color), in the order they were played
+        self.stones = []
+        self.status = None
+        self.dirty = []
+        self.redraw()
+
+    def in_view(self, r, c):
+        return self.top <= r < self.top + self.view and self.left <= c < self.left + self.view
+
+    def cell_center(self, r, c):
+        return MARGIN + (c - self.left) * CELL_SIZE, MARGIN + (r - self.top) * CELL_SIZE
+
+    def stone_rect(self, r, c):
+        radius = CELL_SIZE // 3
+        x, y = self.cell_center(r, c)
+        return pygame.Rect(x - radius, y - radius, 2 * radius + 1, 2 * radius + 1)
+
+    def draw_stone(self, r, c, color):
+        if not self.in_view(r, c):
+            return
+        pygame.draw.circle(self.screen, BLACK_COLOR if color == BLACK else WHITE_COLOR,
+                           self.cell_center(r, c), CELL_SIZE // 3)
+        self.dirty.append(self.stone_rect(r, c))
+
+    def erase_stone(self, r, c):
+        if not self.in_view(r, c):
+            return
+        rect = self.stone_rect(r, c)
+        self.screen.blit(self.background, rect, rect)
+        self.dirty.append(rect)
+
+    def scroll(self, dr, dc):
+        """Move the window by (dr, dc) cells, stopping at the board's edges."""
+        top = min(max(self.top + dr, 0), self.size - self.view)
+        left = min(max(self.left + dc, 0), self.size - self.view)
+        if (top, left) != (self.top, self.left):
+            self.top, self.left = top, left
+            self.redraw()
+
+    def show(self, r, c):
+        """Center the window on (r, c) unless the cell is already in view."""
+        if not self.in_view(r, c):
+            self.scroll(r - self.view // 2 - self.top, c - self.view // 2 - self.left)
+
+    def cell_at(self, pos):
+        """Board cell under the screen position pos, or None."""
+        x, y = pos
+        col = round((x - MARGIN) / CELL_SIZE)
+        row = round((y - MARGIN) / CELL_SIZE)
+        if 0 <= row < self.view and 0 <= col < self.view:
+            return row + self.top, col + self.left
+        return None
+
+    def redraw(self):
+        """Repaint everything, e.g. after the window was covered or scrolled."""
+        self.screen.blit(self.background, (0, 0))
+        for r, c, color in self.stones:
+            if self.in_view(r, c):
+                pygame.draw.circle(self.screen, BLACK_COLOR if color == BLACK else WHITE_COLOR,
+                                   self.cell_center(r, c), CELL_SIZE // 3)
+        status, self.status = self.status, None
+        if status is not None:
+            self.set_status(status)
+        self.dirty = [self.screen.get_rect()]
+
+    def sync(self, game):
+        """Draw the stones played and erase the stones taken back since the last call."""
+        history = game.history
+        if len(history) == len(self.stones) and (
+                not history or history[-1][:2] == self.stones[-1][:2]):
+            return
+        keep = 0
+        while (keep < len(history) and keep < len(self.stones) and
+               history[keep][:2] == self.stones[keep][:2]):
+            keep += 1
+        for r, c, _ in self.stones[keep:]:
+            self.erase_stone(r, c)
+        del self.stones[keep:]
+        for r, c, color, _ in history[keep:]:
+            self.stones.append((r, c, color))
+            self.draw_stone(r, c, color)
+
+    def set_status(self, lines):
+        if lines == self.status:
+            return
+        self.status = lines
+        rect = pygame.Rect(0, self.board_height, self.screen.get_width(), STATUS_HEIGHT)
+        self.screen.blit(self.background, rect, rect)
+        for k, line in enumerate(lines):
+            self.screen.blit(self.font.render(line, True, GRID_COLOR),
+                             (6, self.board_height + 2 + k * 18))
+        self.dirty.append(rect)
+
+    def flush(self):
+        if self.dirty:
+            pygame.display.update(self.dirty)
+            self.dirty = []
 
 def config_menu():
     pygame.init()
-    WIDTH, HEIGHT = 400, 500
+    WIDTH, HEIGHT = 400, 690
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Gomoku Config")
 
@@ -207,7 +240,8 @@ def config_menu():
     ai_type = "alpha-beta"
     ai_type_white = "alpha-beta"
     ai_type_black = "alpha-beta"
-
+    time_limit = None  # None searches to the fixed depth 2
+    save = False  # append the game to games/<size>.gmkr when the window closes
 
     def draw_text(text, x, y, selected=False):
         color = GREEN if selected else BLACK
@@ -235,27 +269,48 @@ def config_menu():
         size1 = draw_text("7 x 7", 50, y_offset + 25, board_size == 7)
         size2 = draw_text("15 x 15", 150, y_offset + 25, board_size == 15)
         size3 = draw_text("19 x 19", 270, y_offset + 25, board_size == 19)
+        size4 = draw_text("50 x 50", 50, y_offset + 55, board_size == 50)
+        size5 = draw_text("Unbounded", 150, y_offset + 55, board_size is None)
 
-        y_offset += 80
+        y_offset += 110
         
         if game_mode == "AI vs AI":
             # AI WHITE Type
             screen.blit(font.render("AI WHITE Type:", True, BLACK), (30, y_offset))
-            aiw1 = draw_text("Minimax", 50, y_offset + 25, ai_type_white == "minimax")
-            aiw2 = draw_text("Alpha-Beta", 200, y_offset + 25, ai_type_white == "alpha-beta")
+            aiw1 = draw_text("Minimax", 30, y_offset + 25, ai_type_white == "minimax")
+            aiw2 = draw_text("Alpha-Beta", 130, y_offset + 25, ai_type_white == "alpha-beta")
+            aiw3 = draw_text("PVS", 250, y_offset + 25, ai_type_white == "pvs")
+            aiw4 = draw_text("MCTS", 310, y_offset + 25, ai_type_white == "mcts")
 
             y_offset += 80
             # AI BLACK Type
             screen.blit(font.render("AI BLACK Type:", True, BLACK), (30, y_offset))
-            aib1 = draw_text("Minimax", 50, y_offset + 25, ai_type_black == "minimax")
-            aib2 = draw_text("Alpha-Beta", 200, y_offset + 25, ai_type_black == "alpha-beta")
+            aib1 = draw_text("Minimax", 30, y_offset + 25, ai_type_black == "minimax")
+            aib2 = draw_text("Alpha-Beta", 130, y_offset + 25, ai_type_black == "alpha-beta")
+            aib3 = draw_text("PVS", 250, y_offset + 25, ai_type_black == "pvs")
+            aib4 = draw_text("MCTS", 310, y_offset + 25, ai_type_black == "mcts")
 
         else:
             # AI Type
             screen.blit(font.render("AI Type:", True, BLACK), (30, y_offset))
-            ai1 = draw_text("Minimax", 50, y_offset + 25, ai_type == "minimax")
-            ai2 = draw_text("Alpha-Beta", 200, y_offset + 25, ai_type == "alpha-beta")
+            ai1 = draw_text("Minimax", 30, y_offset + 25, ai_type == "minimax")
+            ai2 = draw_text("Alpha-Beta", 130, y_offset + 25, ai_type == "alpha-beta")
+            ai3 = draw_text("PVS", 250, y_offset + 25, ai_type == "pvs")
+            ai4 = draw_text("MCTS", 310, y_offset + 25, ai_type == "mcts")
+
+        y_offset += 80
+        # Time per AI move
+        screen.blit(font.render("Time per AI move:", True, BLACK), (30, y_offset))
+        time1 = draw_text("Depth 2", 50, y_offset + 25, time_limit is None)
+        time2 = draw_text("1 s", 150, y_offset + 25, time_limit == 1)
+        time3 = draw_text("3 s", 220, y_offset + 25, time_limit == 3)
+        time4 = draw_text("10 s", 290, y_offset + 25, time_limit == 10)
 
+        y_offset += 80
+        # Game record
+        screen.blit(font.render("Save game record:", True, BLACK), (30, y_offset))
+        save1 = draw_text("No", 50, y_offset + 25, not save)
+        save2 = draw_text("Yes", 150, y_offset + 25, save)
 
         y_offset += 100
         # Play Button
@@ -284,22 +339,54 @@ def config_menu():
                     board_size = 15
                 elif size3.collidepoint((mx, my)):
                     board_size = 19
-
-                elif ai1.collidepoint((mx, my)):
+                elif size4.collidepoint((mx, my)):
+                    board_size = 50
+                elif size5.collidepoint((mx, my)):
+                    board_size = None
+
+                elif time1.collidepoint((mx, my)):
+                    time_limit = None
+                elif time2.collidepoint((mx, my)):
+                    time_limit = 1
+                elif time3.collidepoint((mx, my)):
+                    time_limit = 3
+                elif time4.collidepoint((mx, my)):
+                    time_limit = 10
+
+                elif save1.collidepoint((mx, my)):
+                    save = False
+                elif save2.collidepoint((mx, my)):
+                    save = True
+
+                # the rows not on screen keep the rects of an earlier frame
+                elif game_mode == "Player vs AI" and ai1.collidepoint((mx, my)):
                     ai_type = "minimax"
-                elif ai2.collidepoint((mx, my)):
+                elif game_mode == "Player vs AI" and ai2.collidepoint((mx, my)):
                     ai_type = "alpha-beta"
+                elif game_mode == "Player vs AI" and ai3.collidepoint((mx, my)):
+                    ai_type = "pvs"
+                elif game_mode == "Player vs AI" and ai4.collidepoint((mx, my)):
+                    ai_type = "mcts"
                 elif game_mode == "AI vs AI" and aiw1.collidepoint((mx, my)):
                     ai_type_white = "minimax"
                 elif game_mode == "AI vs AI" and aiw2.collidepoint((mx, my)):
                     ai_type_white = "alpha-beta"
+                elif game_mode == "AI vs AI" and aiw3.collidepoint((mx, my)):
+                    ai_type_white = "pvs"
+                elif game_mode == "AI vs AI" and aiw4.collidepoint((mx, my)):
+                    ai_type_white = "mcts"
                 elif game_mode == "AI vs AI" and aib1.collidepoint((mx, my)):
                     ai_type_black = "minimax"
                 elif game_mode == "AI vs AI" and aib2.collidepoint((mx, my)):
                     ai_type_black = "alpha-beta"
+                elif game_mode == "AI vs AI" and aib3.collidepoint((mx, my)):
+                    ai_type_black = "pvs"
+                elif game_mode == "AI vs AI" and aib4.collidepoint((mx, my)):
+                    ai_type_black = "mcts"
 
                 elif play_button_rect.collidepoint((mx, my)):
-                    return game_mode, board_size, ai_type, ai_type_white, ai_type_black
+                    return (game_mode, board_size, ai_type, ai_type_white, ai_type_black, time_limit,
+                            save)
 
 
 def show_result_popup(message):
@@ -310,81 +397,155 @@ def show_result_popup(message):
 
 
 def main():
-    game_mode, board_size, ai_type, ai_type_white, ai_type_black = config_menu()
-    game = Game(board_size)
+    load_gui()
+    (game_mode, board_size, ai_type, ai_type_white, ai_type_black, time_limit,
+     save) = config_menu()
+    if board_size is None or board_size > VIEW:
+        # stones only: memory, move generation and evaluation follow the stones
+        game = Game(board_size, backend="sparse")
+        if board_size is None:
+            # MCTS playouts fill the whole board, too much for an unbounded one
+            ai_type, ai_type_white, ai_type_black = (
+                "pvs" if t == "mcts" else t for t in (ai_type, ai_type_white, ai_type_black))
+    else:
+        game = Game(board_size, backend="bitboard", incremental_eval=True)
+    view = min(game.size, VIEW)
 
     pygame.init()
-    screen = pygame.display.set_mode((CELL_SIZE * board_size + MARGIN * 0,
-                                      CELL_SIZE * board_size + MARGIN * 0))
+    screen = pygame.display.set_mode((CELL_SIZE * view + MARGIN * 0,
+                                      CELL_SIZE * view + MARGIN * 0 + STATUS_HEIGHT))
     pygame.display.set_caption("Gomoku")
     clock = pygame.time.Clock()
+    renderer = BoardRenderer(screen, game.size, pygame.font.SysFont(None, 20))
+    scroll_keys = {pygame.K_UP: (-1, 0), pygame.K_DOWN: (1, 0),
+                   pygame.K_LEFT: (0, -1), pygame.K_RIGHT: (0, 1)}
+    # the window needs a full repaint after being uncovered (e.g. by a popup)
+    expose_events = (pygame.VIDEOEXPOSE, getattr(pygame, "WINDOWEXPOSED", pygame.VIDEOEXPOSE))
 
     running = True
     game_over = False
+    # the AISearch running in the background, None while nobody is thinking
+    search = None
+    paused = False
 
     if game_mode == "AI vs AI":
         pygame.time.set_timer(pygame.USEREVENT, 500)
 
-    while running:
-        draw_board(screen, game)
-        pygame.display.flip()
+    def check_end(color, win_message):
+        if game.is_winner(color):
+            message = win_message
+        elif game.is_draw():
+            message = "Draw!"
+        else:
+            return False
+        # show the final stone before the popup covers the window
+        renderer.sync(game)
+        renderer.set_status(["Game over"])
+        renderer.flush()
+        show_result_popup(message)
+        renderer.redraw()
+        return True
 
+    while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
 
-            if not game_over:
+            elif event.type in expose_events:
+                renderer.redraw()
+
+            # scrolling works at any time, also while the AI thinks
+            elif event.type == pygame.KEYDOWN and event.key in scroll_keys:
+                renderer.scroll(*scroll_keys[event.key])
+
+            elif event.type == pygame.MOUSEWHEEL:
+                # the wheel scrolls rows, with shift held columns
+                if pygame.key.get_mods() & pygame.KMOD_SHIFT:
+                    renderer.scroll(0, -event.y)
+                else:
+                    renderer.scroll(-event.y, -event.x)
+
+            elif event.type == pygame.KEYDOWN and search is not None:
+                if event.key in (pygame.K_SPACE, pygame.K_f):
+                    search.force()
+                elif event.key == pygame.K_ESCAPE:
+                    search.cancel()
+
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                if game_mode == "AI vs AI":
+                    paused = not paused
+
+            elif game_over or search is not None:
+                continue
+
+            elif game_mode == "Player vs AI":
+                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                    cell = renderer.cell_at(event.pos)
+                    if cell:
+                        r, c = cell
+                        if game.board.get(r, c) == EMPTY:
+                            game.make_move(r, c, BLACK)
+                            game_over = check_end(BLACK, "You Win!")
+                            if not game_over:
+                                search = AISearch(game, ai_type, WHITE, time_limit)
+
+            elif game_mode == "AI vs AI" and event.type == pygame.USEREVENT and not paused:
+                current_color = WHITE if len(game.history) % 2 == 0 else BLACK
+                current_ai_type = ai_type_white if current_color == WHITE else ai_type_black
+                search = AISearch(game, current_ai_type, current_color, time_limit)
+
+        # apply a finished search, leaving the previous move on screen for at
+        # least MOVE_PAUSE instead of blocking the loop with a delay
+        if search is not None and search.done and search.elapsed * 1000 >= MOVE_PAUSE:
+            game.keep_tree(search.game)
+            if search.cancelled:
                 if game_mode == "Player vs AI":
-                    if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                        cell = get_cell_from_mouse(event.pos, game.size)
-                        if cell:
-                            r, c = cell
-                            if game.matrix[r, c] == EMPTY:
-                                game.matrix[r, c] = BLACK
-                                draw_board(screen, game)
-                                pygame.display.flip()
-                                pygame.time.delay(300)
-
-                                if game.is_winner(BLACK):
-                                    show_result_popup("You Win!")
-                                    game_over = True
-                                    break
-                                if game.is_draw():
-                                    show_result_popup("Draw!")
-                                    game_over = True
-                                    break
-
-                                ai_move = game.ai_move(ai_type=ai_type, color=WHITE)
-                                draw_board(screen, game)
-                                pygame.display.flip()
-                                pygame.time.delay(300)
-
-                                if ai_move and game.is_winner(WHITE):
-                                    show_result_popup("AI Wins!")
-                                    game_over = True
-                                elif game.is_draw():
-                                    show_result_popup("Draw!")
-                                    game_over = True
-
-                if game_mode == "AI vs AI" and event.type == pygame.USEREVENT:
-                    current_color = WHITE if np.count_nonzero(game.matrix == WHITE) <= np.count_nonzero(game.matrix == BLACK) else BLACK
-                    current_ai_type = ai_type_white if current_color == WHITE else ai_type_black
-                    move = game.ai_move(ai_type=current_ai_type, color=current_color)
-                    
-                    draw_board(screen, game)
-                    pygame.display.flip()
-                    pygame.time.delay(300)
-
-                    if move and game.is_winner(current_color):
-                        show_result_popup(f"{'AI WHITE' if current_color == WHITE else 'AI BLACK'} wins!")
-                        game_over = True
-                    elif game.is_draw():
-                        show_result_popup("Draw!")
-                        game_over = True
+                    game.undo_move()  # take back the move the AI was answering
+                else:
+                    paused = True
+            elif search.move:
+                game.make_move(search.move[0], search.move[1], search.color)
+                renderer.show(*search.move)
+                if game_mode == "Player vs AI":
+                    game_over = check_end(WHITE, "AI Wins!")
+                else:
+                    game_over = check_end(search.color,
+                                          f"{'AI WHITE' if search.color == WHITE else 'AI BLACK'} wins!")
+            search = None
+
+        if search is not None:
+            status = [search.status(), "Space: move now   Esc: cancel"]
+        elif game_over:
+            status = ["Game over"]
+        elif paused:
+            status = ["Paused", "Esc: resume"]
+        elif game_mode == "Player vs AI":
+            status = ["Your move (black)"]
+        else:
+            status = ["Esc: pause"]
+        if renderer.view < renderer.size and len(status) == 1:
+            status.append(f"Arrows/wheel: scroll   view rows {renderer.top}-"
+                          f"{renderer.top + renderer.view - 1}, columns {renderer.left}-"
+                          f"{renderer.left + renderer.view - 1}")
+        renderer.sync(game)
+        renderer.set_status(status)
+        renderer.flush()
 
         clock.tick(FPS)
 
+    if search is not None:
+        search.cancel()
     pygame.quit()
+    # finished or not, the game is kept when asked for (see gomoku.records)
+    if save and game.history:
+        if game_mode == "Player vs AI":
+            players = {"white": {"ai_type": ai_type, "time_limit": time_limit}, "black": "human"}
+        else:
+            players = {"white": {"ai_type": ai_type_white, "time_limit": time_limit},
+                       "black": {"ai_type": ai_type_black, "time_limit": time_limit}}
+        path = save_game(game, players)
+        if path:
+            print(f"Game saved to {path}")
 
 if __name__ == "__main__":
     main()
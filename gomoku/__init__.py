@@ -0,0 +1 @@
+"""Engine components shared by the Gomoku CLI and UI."""
@@ -0,0 +1,259 @@
+"""Reproducible search benchmark over the fixed positions in benchmarks/.
+
+    python -m gomoku.benchmark --out bench.json
+    python -m gomoku.benchmark --baseline bench.json --threshold 0.10
+    python -m gomoku.benchmark --ordering neighbors --out old.json   # then --baseline old.json
+    python -m gomoku.benchmark --startup   # import and first-search time of a worker
+    python -m gomoku.benchmark --move-scoring --sizes 19   # batch vs per-move scoring
+
+Every position is searched from a fresh Game (empty transposition table)
+with each ai_type at each depth. The output records nodes, seconds, nodes
+per second, alpha-beta cutoffs (and how often the first move cut off) and
+the chosen move. With --baseline, runs whose node count or
+time grew by more than the threshold are flagged as regressions, changed
+moves are listed, and the exit status is 1 when anything regressed.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from gomoku.constants import WHITE, BLACK
+
+POSITIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                         "benchmarks", "positions.json")
+DEPTHS = {"minimax": (1, 2), "alpha-beta": (1, 2, 3), "pvs": (1, 2, 3)}
+QUICK_DEPTHS = {"minimax": (1,), "alpha-beta": (1, 2), "pvs": (1, 2)}
+# no opening book, the positions are there to measure the search
+GAME_OPTIONS = {"backend": "bitboard", "incremental_eval": True, "book": False}
+# nor the threat solver, which would answer the tactical positions before
+# the search starts
+MOVE_OPTIONS = {"threat_search": False}
+
+
+def load_positions(path=POSITIONS, sizes=None):
+    with open(path) as f:
+        positions = json.load(f)
+    return [p for p in positions if not sizes or p["size"] in sizes]
+
+
+def setup(position, game_options=None):
+    """Fresh Game with the position's moves played, and the side to move."""
+    from gomoku.game import Game
+    game = Game(position["size"], **(game_options or GAME_OPTIONS))
+    color = WHITE
+    for i, j in position["moves"]:
+        game.make_move(i, j, color)
+        color = BLACK if color == WHITE else WHITE
+    return game, color
+
+
+def run_position(position, ai_type, depth, game_options=None, move_options=None):
+    game, color = setup(position, game_options)
+    start = time.perf_counter()
+    move, stats = game.ai_move(ai_type, color, depth=depth, with_stats=True,
+                               **{**MOVE_OPTIONS, **(move_options or {})})
+    seconds = time.perf_counter() - start
+    return {
+        "position": position["name"],
+        "kind": position["kind"],
+        "size": position["size"],
+        "ai_type": ai_type,
+        "depth": depth,
+        "nodes": game.nodes,
+        "seconds": round(seconds, 4),
+        "nps": round(game.nodes / seconds) if seconds else 0,
+        "cutoffs": stats.cutoffs,
+        "first_move_cutoff_rate": stats.first_move_cutoff_rate,
+        "move": list(move) if move else None,
+    }
+
+
+def run_suite(positions, depths=DEPTHS, game_options=None, move_options=None, log=None):
+    results = []
+    for position in positions:
+        for ai_type, ai_depths in depths.items():
+            for depth in ai_depths:
+                result = run_position(position, ai_type, depth, game_options, move_options)
+                results.append(result)
+                if log:
+                    rate = result["first_move_cutoff_rate"]
+                    log(f"{result['position']:22} {ai_type:10} d{depth} "
+                        f"{result['nodes']:>9,} nodes {result['seconds']:8.3f}s "
+                        f"{result['nps']:>8,} n/s {result['cutoffs']:>7,} cutoffs "
+                        f"{'-' if rate is None else f'{rate:.0%}':>4} first move {result['move']}")
+    return results
+
+
+def node_totals(results, baseline):
+    """Total nodes per (ai_type, depth) over the runs both reports have."""
+    old = {(r["position"], r["ai_type"], r["depth"]): r for r in baseline["results"]}
+    totals = {}
+    for r in results:
+        before = old.get((r["position"], r["ai_type"], r["depth"]))
+        if before is not None:
+            total = totals.setdefault((r["ai_type"], r["depth"]), [0, 0])
+            total[0] += before["nodes"]
+            total[1] += r["nodes"]
+    return totals
+
+
+def compare(results, baseline, threshold, min_seconds=0.1):
+    """Return (regressions, changed_moves) as lists of message strings.
+
+    Timings shorter than min_seconds are too noisy to compare and only their
+    node counts are checked.
+    """
+    old = {(r["position"], r["ai_type"], r["depth"]): r for r in baseline["results"]}
+    regressions, changed = [], []
+    for r in results:
+        key = (r["position"], r["ai_type"], r["depth"])
+        if key not in old:
+            continue
+        before = old[key]
+        label = f"{r['position']} {r['ai_type']} d{r['depth']}"
+        for field in ("nodes", "seconds"):
+            if field == "seconds" and before[field] < min_seconds:
+                continue
+            if before[field] and r[field] > before[field] * (1 + threshold):
+                regressions.append(f"{label}: {field} {before[field]} -> {r[field]} "
+                                   f"(+{r[field] / before[field] - 1:.0%})")
+        if r["move"] != before["move"]:
+            changed.append(f"{label}: move {before['move']} -> {r['move']}")
+    return regressions, changed
+
+
+# what a search-only worker process pays before its first move, each run in
+# a fresh interpreter: (label, code timed from the first statement)
+STARTUP_STEPS = [
+    ("import gomoku.game", "import gomoku.game"),
+    ("import + first search",
+     "from gomoku.game import Game; g = Game(15, backend='bitboard', incremental_eval=True, "
+     "book=False); g.make_move(7, 7, 2); g.ai_move('alpha-beta', 1, depth=1)"),
+    ("import Gomaku_game_UI", "import Gomaku_game_UI"),
+]
+
+
+def startup(repeat=5):
+    """Best-of-repeat milliseconds for every STARTUP_STEPS entry."""
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+    results = {}
+    for label, code in STARTUP_STEPS:
+        timed = ("import time; _t = time.perf_counter()\n" + code +
+                 "\nprint((time.perf_counter() - _t) * 1000)")
+        runs = [float(subprocess.run([sys.executable, "-c", timed], cwd=root, check=True,
+                                     capture_output=True, text=True).stdout)
+                for _ in range(repeat)]
+        results[label] = round(min(runs), 1)
+    return results
+
+
+def move_scoring(positions, repeat=5, number=20):
+    """Microseconds to score candidate moves one by one and as a whole grid.
+
+    Per position: the per-move tactical score (MoveOrdering.tactical) over
+    the candidates and over every empty cell, and one Game.move_scores grid,
+    which covers every empty cell.
+    """
+    import timeit
+    results = []
+    for position in positions:
+        game, _ = setup(position)
+        ordering = game.ordering
+        candidates = game.get_all_valid_moves()
+        empty = game.board.empty_cells()
+
+        def best(fn):
+            return round(min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6)
+
+        results.append({
+            "position": position["name"],
+            "size": position["size"],
+            "candidates": len(candidates),
+            "empty": len(empty),
+            "per_move_candidates_us": best(lambda: [ordering.tactical(game, i, j)
+                                                    for i, j in candidates]),
+            "per_move_empty_us": best(lambda: [ordering.tactical(game, i, j) for i, j in empty]),
+            "grid_us": best(game.move_scores),
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gomoku search benchmark")
+    parser.add_argument("--positions", default=POSITIONS)
+    parser.add_argument("--sizes", type=int, nargs="+", help="only these board sizes")
+    parser.add_argument("--quick", action="store_true", help="shallow depths only")
+    parser.add_argument("--minimax-depths", type=int, nargs="*")
+    parser.add_argument("--alpha-beta-depths", type=int, nargs="*")
+    parser.add_argument("--pvs-depths", type=int, nargs="*")
+    parser.add_argument("--out", help="write the results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier --out to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative growth in nodes or time reported as a regression")
+    parser.add_argument("--min-seconds", type=float, default=0.1,
+                        help="ignore timing changes of runs shorter than this")
+    parser.add_argument("--ordering", choices=["history", "neighbors"], default="history",
+                        help="alpha-beta move ordering (see gomoku.ordering)")
+    parser.add_argument("--startup", action="store_true",
+                        help="only measure import and first-search time of a fresh process")
+    parser.add_argument("--move-scoring", action="store_true",
+                        help="only time per-move against whole-board move scoring")
+    parser.add_argument("--root-width", type=int, default=None,
+                        help="search only this many root moves (see Game.top_moves)")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        for label, ms in startup().items():
+            print(f"{label:24} {ms:8.1f} ms")
+        return 0
+    if args.move_scoring:
+        for r in move_scoring(load_positions(args.positions, args.sizes)):
+            print(f"{r['position']:22} {r['candidates']:>4} candidates "
+                  f"{r['per_move_candidates_us']:>6} us, {r['empty']:>4} empty "
+                  f"{r['per_move_empty_us']:>6} us per move; grid {r['grid_us']:>6} us")
+        return 0
+
+    depths = dict(QUICK_DEPTHS if args.quick else DEPTHS)
+    if args.minimax_depths is not None:
+        depths["minimax"] = args.minimax_depths
+    if args.alpha_beta_depths is not None:
+        depths["alpha-beta"] = args.alpha_beta_depths
+    if args.pvs_depths is not None:
+        depths["pvs"] = args.pvs_depths
+    game_options = dict(GAME_OPTIONS, ordering=args.ordering)
+    move_options = {"root_width": args.root_width} if args.root_width else None
+    results = run_suite(load_positions(args.positions, args.sizes), depths, game_options,
+                        move_options, log=print)
+    report = {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                 "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "ordering": args.ordering,
+                 "root_width": args.root_width},
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for (ai_type, depth), (before, after) in sorted(node_totals(results, baseline).items()):
+            change = f"{after / before - 1:+.0%}" if before else "n/a"
+            print(f"nodes    {ai_type} d{depth}: {before:,} -> {after:,} ({change})")
+        regressions, changed = compare(results, baseline, args.threshold, args.min_seconds)
+        for line in changed:
+            print("changed  ", line)
+        for line in regressions:
+            print("REGRESSED", line)
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""Board storage backends for Game.
+
+All backends expose the same small interface (get, place, remove, is_five,
+count_neighbors, empty_cells and a ``matrix`` view), so Game can switch
+between them without touching the search code. The sparse backend keeps
+only the occupied cells, for boards far larger than the stones on them.
+"""
+import numpy as np
+
+from gomoku.constants import EMPTY, WHITE, BLACK, DIRECTIONS
+
+
+class MatrixBoard:
+    """The original representation: one int per cell in a NumPy matrix."""
+
+    def __init__(self, size):
+        self.size = size
+        self.cells = np.zeros((size, size), dtype=int)
+
+    @property
+    def matrix(self):
+        return self.cells
+
+    def get(self, i, j):
+        return self.cells[i, j]
+
+    def place(self, i, j, color):
+        self.cells[i, j] = color
+
+    def remove(self, i, j):
+        self.cells[i, j] = EMPTY
+
+    def is_five(self, i, j, color):
+        for di, dj in DIRECTIONS:
+            count = 1
+            x, y = i + di, j + dj
+            while 0 <= x < self.size and 0 <= y < self.size and self.cells[x, y] == color:
+                count += 1
+                x, y = x + di, y + dj
+            x, y = i - di, j - dj
+            while 0 <= x < self.size and 0 <= y < self.size and self.cells[x, y] == color:
+                count += 1
+                x, y = x - di, y - dj
+            if count >= 5:
+                return True
+        return False
+
+    def count_neighbors(self, i, j):
+        return int(np.count_nonzero(self.cells[max(i - 1, 0):i + 2, max(j - 1, 0):j + 2]))
+
+    def empty_cells(self):
+        return [(int(i), int(j)) for i, j in np.argwhere(self.cells == EMPTY)]
+
+
+class BitBoard:
+    """One Python big-int per color, cell (i, j) at bit i * stride + j.
+
+    Rows are padded with one always-empty guard column (stride = size + 1), so
+    a shift by 1, stride, stride + 1 or stride - 1 moves every stone one step
+    along a row, column, diagonal or anti-diagonal without wrapping into the
+    next row. Five in a row is then four shifts and ANDs per direction.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.stride = size + 1
+        self.bits = [0, 0, 0]  # indexed by color, EMPTY unused
+        self.shifts = (1, self.stride, self.stride + 1, self.stride - 1)
+        self.full = 0
+        for i in range(size):
+            self.full |= ((1 << size) - 1) << (i * self.stride)
+        # occupancy mask of the 3x3 block around every cell, for count_neighbors
+        self.neighbor_masks = [0] * (size * self.stride)
+        for i in range(size):
+            for j in range(size):
+                mask = 0
+                for x in range(max(i - 1, 0), min(i + 2, size)):
+                    for y in range(max(j - 1, 0), min(j + 2, size)):
+                        mask |= 1 << (x * self.stride + y)
+                self.neighbor_masks[i * self.stride + j] = mask
+
+    @property
+    def matrix(self):
+        # read-only snapshot for printing and drawing
+        nbytes = (self.size * self.stride + 7) // 8
+        view = np.zeros(self.size * self.stride, dtype=int)
+        for color in (WHITE, BLACK):
+            raw = np.frombuffer(self.bits[color].to_bytes(nbytes, "little"), dtype=np.uint8)
+            view[np.unpackbits(raw, bitorder="little")[:self.size * self.stride] == 1] = color
+        return view.reshape(self.size, self.stride)[:, :self.size]
+
+    def get(self, i, j):
+        idx = i * self.stride + j
+        if self.bits[WHITE] >> idx & 1:
+            return WHITE
+        if self.bits[BLACK] >> idx & 1:
+            return BLACK
+        return EMPTY
+
+    def place(self, i, j, color):
+        self.bits[color] |= 1 << (i * self.stride + j)
+
+    def remove(self, i, j):
+        mask = ~(1 << (i * self.stride + j))
+        self.bits[WHITE] &= mask
+        self.bits[BLACK] &= mask
+
+    def is_five(self, i, j, color):
+        # only a five through the last stone is possible, so the whole-board
+        # check is exact and cheaper than walking the four lines cell by cell
+        x = self.bits[color]
+        for s in self.shifts:
+            pairs = x & (x >> s)
+            fours = pairs & (pairs >> 2 * s)
+            if fours & (x >> 4 * s):
+                return True
+        return False
+
+    def count_neighbors(self, i, j):
+        occupied = self.bits[WHITE] | self.bits[BLACK]
+        return (occupied & self.neighbor_masks[i * self.stride + j]).bit_count()
+
+    def empty_cells(self):
+        free = self.full & ~(self.bits[WHITE] | self.bits[BLACK])
+        cells = []
+        while free:
+            low = free & -free
+            cells.append(divmod(low.bit_length() - 1, self.stride))
+            free ^= low
+        return cells
+
+
+class SparseBoard:
+    """Only the occupied cells, in a dict keyed by (i, j).
+
+    Every operation costs O(1) or O(stones) whatever the size, except the
+    dense views (matrix, empty_cells), which are only built for boards of at
+    most MATRIX_LIMIT cells a side. Game(None, backend="sparse") plays on an
+    UNBOUNDED x UNBOUNDED board, which no game ever reaches the edge of.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.stones = {}
+        # per direction of DIRECTIONS: line id -> [0, white bits, black bits],
+        # bit p for the cell at position p along the line (see line_keys)
+        self.lines = tuple({} for _ in DIRECTIONS)
+
+    @staticmethod
+    def line_keys(i, j):
+        """(line id, position on the line) of (i, j) for each of DIRECTIONS."""
+        return (i, j), (j, i), (i - j, i), (i + j, i)
+
+    def dense(self):
+        if self.size > MATRIX_LIMIT:
+            raise ValueError(f"no dense view of a {self.size}x{self.size} sparse board")
+
+    @property
+    def matrix(self):
+        self.dense()
+        view = np.zeros((self.size, self.size), dtype=int)
+        for (i, j), color in self.stones.items():
+            view[i, j] = color
+        return view
+
+    def get(self, i, j):
+        return self.stones.get((i, j), EMPTY)
+
+    def place(self, i, j, color):
+        self.stones[i, j] = color
+        for lines, (lid, pos) in zip(self.lines, self.line_keys(i, j)):
+            bits = lines.get(lid)
+            if bits is None:
+                bits = lines[lid] = [0, 0, 0]
+            bits[color] |= 1 << pos
+
+    def remove(self, i, j):
+        color = self.stones.pop((i, j))
+        for lines, (lid, pos) in zip(self.lines, self.line_keys(i, j)):
+            lines[lid][color] &= ~(1 << pos)
+
+    def segment(self, i, j, direction, reach):
+        """(white bits, black bits, length, position of (i, j)) of the cells
+        within reach of (i, j) along DIRECTIONS[direction], clipped to the board."""
+        lid, pos = self.line_keys(i, j)[direction]
+        last = self.size - 1
+        if direction == 2:
+            first, last = max(lid, 0), min(last, last + lid)
+        elif direction == 3:
+            first, last = max(lid - last, 0), min(last, lid)
+        else:
+            first = 0
+        lo, hi = max(pos - reach, first), min(pos + reach, last)
+        bits = self.lines[direction].get(lid)
+        if bits is None:
+            return 0, 0, hi - lo + 1, pos - lo
+        mask = (1 << (hi - lo + 1)) - 1
+        return bits[WHITE] >> lo & mask, bits[BLACK] >> lo & mask, hi - lo + 1, pos - lo
+
+    def is_five(self, i, j, color):
+        stones = self.stones
+        for di, dj in DIRECTIONS:
+            count = 1
+            x, y = i + di, j + dj
+            while stones.get((x, y)) == color:
+                count += 1
+                x, y = x + di, y + dj
+            x, y = i - di, j - dj
+            while stones.get((x, y)) == color:
+                count += 1
+                x, y = x - di, y - dj
+            if count >= 5:
+                return True
+        return False
+
+    def has_five(self, color):
+        return any(c == color and self.is_five(i, j, color) for (i, j), c in self.stones.items())
+
+    def count_neighbors(self, i, j):
+        stones = self.stones
+        return sum((x, y) in stones for x in (i - 1, i, i + 1) for y in (j - 1, j, j + 1))
+
+    def empty_cells(self):
+        self.dense()
+        return [(i, j) for i in range(self.size) for j in range(self.size)
+                if (i, j) not in self.stones]
+
+    def extent(self, margin=0):
+        """(rows, cols) ranges covering the stones plus margin, clipped to the board."""
+        if not self.stones:
+            center = self.size // 2
+            return range(center, center + 1), range(center, center + 1)
+        rows = [i for i, _ in self.stones]
+        cols = [j for _, j in self.stones]
+        return (range(max(min(rows) - margin, 0), min(max(rows) + margin + 1, self.size)),
+                range(max(min(cols) - margin, 0), min(max(cols) + margin + 1, self.size)))
+
+
+# side of the board Game(None, backend="sparse") plays on; cell indices
+# i * size + j still fit the transposition table and Game.compact_state
+UNBOUNDED = 1 << 14
+# largest sparse board with a dense matrix view (which move_scores, MCTS
+# playouts and non-incremental evaluators need)
+MATRIX_LIMIT = 64
+
+BACKENDS = {
+    "matrix": MatrixBoard,
+    "bitboard": BitBoard,
+    "sparse": SparseBoard,
+}
@@ -0,0 +1,281 @@
+"""Opening book keyed by symmetry-canonical Zobrist hashes.
+
+A position and its 7 rotations/reflections share one book entry: the key is
+the smallest Zobrist hash over the 8 symmetries (with the side to move mixed
+in), and the stored move is expressed in that canonical orientation.
+
+Build or extend a book from self-play or analysis output::
+
+    python -m gomoku.book books/15.book results.jsonl --size 15 --max-ply 10
+    python -m gomoku.book books/15.book --extend --self-play 200 --engine alpha-beta,depth=2
+
+Input lines are either tournament results (gomoku.tournament, every engine
+move after the random opening of a finished game counts with the game's
+result; games stopped at --max-plies are left out) or analysis
+records ``{"size": 15, "moves": [[i, j], ...], "move": [i, j]}`` whose move
+counts as a won game. Inputs ending in .gmkr are binary game records
+(gomoku.records), streamed a game at a time; every move of a finished game
+after a tournament's random opening counts with its result.
+
+File layout (little endian)::
+
+    16-byte header  magic "GMKB", version u2, size u2, max_ply u2, 0 u2, count u4
+    keys   u8[count]  sorted canonical keys (an entry per key and move)
+    moves  u2[count]  canonical cell index i * size + j
+    games  u4[count]
+    points u4[count]  2 per win, 1 per draw for the side that played the move
+
+The arrays are memory-mapped when the book is opened, so a large book costs
+nothing until a position is looked up.
+"""
+import json
+import os
+import struct
+from functools import lru_cache
+
+import numpy as np
+
+from gomoku.constants import EMPTY, WHITE, BLACK
+from gomoku.zobrist import zobrist_keys
+
+MAGIC = b"GMKB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHHI")
+BOOKS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "books")
+# average points per game a book move needs (1 is a draw); worse moves are
+# left to the search
+MIN_SCORE = 1
+
+
+def book_path(size):
+    """Default book file for a board size."""
+    return os.path.join(BOOKS, f"{size}.book")
+
+
+def symmetries(size):
+    """The 8 maps (i, j) -> (i', j') of the square board."""
+    n = size - 1
+    return (
+        lambda i, j: (i, j),
+        lambda i, j: (j, n - i),
+        lambda i, j: (n - i, n - j),
+        lambda i, j: (n - j, i),
+        lambda i, j: (i, n - j),
+        lambda i, j: (n - i, j),
+        lambda i, j: (j, i),
+        lambda i, j: (n - j, n - i),
+    )
+
+
+# INVERSE[k] undoes symmetries(size)[k]: the quarter turns undo each other,
+# the rest are their own inverse
+INVERSE = (0, 3, 2, 1, 4, 5, 6, 7)
+
+
+def canonical_key(size, stones, color):
+    """Return (key, symmetry index) of stones [(i, j, color)] with color to move."""
+    cell_keys, extra = zobrist_keys(size)
+    best = None
+    for index, sym in enumerate(symmetries(size)):
+        key = extra[color]
+        for i, j, c in stones:
+            a, b = sym(i, j)
+            key ^= cell_keys[a * size + b][c]
+        if best is None or key < best[0]:
+            best = (key, index)
+    return best
+
+
+class OpeningBook:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, version, self.size, self.max_ply, _, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} opening book")
+        self.path = path
+        if count:
+            raw = np.memmap(path, dtype=np.uint8, mode="r")
+            offset = HEADER.size
+            self.keys = raw[offset:offset + 8 * count].view("<u8")
+            offset += 8 * count
+            self.moves = raw[offset:offset + 2 * count].view("<u2")
+            offset += 2 * count
+            self.games = raw[offset:offset + 4 * count].view("<u4")
+            offset += 4 * count
+            self.points = raw[offset:offset + 4 * count].view("<u4")
+        else:
+            self.keys = np.zeros(0, dtype="<u8")
+            self.moves = np.zeros(0, dtype="<u2")
+            self.games = self.points = np.zeros(0, dtype="<u4")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def entries(self, key):
+        """[(cell, games, points)] stored for a canonical key."""
+        lo = int(np.searchsorted(self.keys, np.uint64(key), "left"))
+        hi = int(np.searchsorted(self.keys, np.uint64(key), "right"))
+        return [(int(self.moves[k]), int(self.games[k]), int(self.points[k])) for k in range(lo, hi)]
+
+    def lookup(self, game, color, min_games=1, min_score=MIN_SCORE):
+        """Book move (i, j) for color in game's position, or None.
+
+        The move with the best average result is played, ties going to the
+        more often played one; None when even that one averages below
+        min_score points a game.
+        """
+        if game.size != self.size or len(game.history) > self.max_ply or not len(self):
+            return None
+        key, index = canonical_key(self.size, [(i, j, c) for i, j, c, _ in game.history], color)
+        entries = [e for e in self.entries(key) if e[1] >= min_games]
+        if not entries:
+            return None
+        cell, games, points = max(entries, key=lambda e: (e[2] / e[1], e[1]))
+        if points < min_score * games:
+            return None
+        i, j = symmetries(self.size)[INVERSE[index]](*divmod(cell, self.size))
+        # a hash collision could name an occupied cell
+        if game.board.get(i, j) != EMPTY:
+            return None
+        return i, j
+
+
+@lru_cache(maxsize=None)
+def open_book(path):
+    """Memory-map the book at path, or None when there is no such file."""
+    if not os.path.exists(path):
+        return None
+    return OpeningBook(path)
+
+
+class BookBuilder:
+    """Accumulates (position, move) -> games, points before writing a book."""
+
+    def __init__(self, size, max_ply=10):
+        self.size = size
+        self.max_ply = max_ply
+        self.counts = {}
+
+    def load(self, path):
+        book = OpeningBook(path)
+        if book.size != self.size:
+            raise ValueError(f"{path} is a book for size {book.size}, not {self.size}")
+        self.max_ply = max(self.max_ply, book.max_ply)
+        for key, move, games, points in zip(book.keys.tolist(), book.moves.tolist(),
+                                            book.games.tolist(), book.points.tolist()):
+            entry = self.counts.setdefault((key, move), [0, 0])
+            entry[0] += games
+            entry[1] += points
+
+    def add(self, moves, ply, points, games=1, first=WHITE):
+        """Count moves[ply] played in the position after moves[:ply], first moving first."""
+        if ply > self.max_ply:
+            return
+        second = BLACK if first == WHITE else WHITE
+        stones = [(i, j, first if k % 2 == 0 else second) for k, (i, j) in enumerate(moves[:ply])]
+        color = first if ply % 2 == 0 else second
+        key, index = canonical_key(self.size, stones, color)
+        i, j = symmetries(self.size)[index](*moves[ply])
+        entry = self.counts.setdefault((key, i * self.size + j), [0, 0])
+        entry[0] += games
+        entry[1] += points
+
+    def add_game(self, record):
+        """Add the engine moves of a finished gomoku.tournament result line."""
+        moves = record["moves"]
+        if record["winner"] is None:
+            # a draw fills the board; a game stopped at max_plies has no result
+            if len(moves) < self.size * self.size:
+                return
+            winner = EMPTY
+        else:
+            a_color = WHITE if record["a_color"] == "white" else BLACK
+            winner = a_color if record["winner"] == "A" else (BLACK if a_color == WHITE else WHITE)
+        for ply in range(record.get("opening_plies", 0), min(len(moves), self.max_ply + 1)):
+            mover = WHITE if ply % 2 == 0 else BLACK
+            self.add(moves, ply, 1 if winner == EMPTY else 2 * (winner == mover))
+
+    def add_game_record(self, record):
+        """Add the engine moves of a finished gomoku.records.GameRecord (all
+        of them but a tournament's random opening)."""
+        from gomoku.records import DRAW
+        if record.size != self.size or record.result == EMPTY:
+            return
+        for ply in range(record.config.get("opening_plies", 0),
+                         min(len(record.moves), self.max_ply + 1)):
+            if record.result == DRAW:
+                points = 1
+            else:
+                points = 2 * (record.result == record.color(ply))
+            self.add(record.moves, ply, points, first=record.first)
+
+    def add_record(self, record):
+        if record.get("size", self.size) != self.size:
+            return
+        if "winner" in record:
+            self.add_game(record)
+        else:
+            self.add(record["moves"] + [record["move"]], len(record["moves"]), 2)
+
+    def write(self, path, min_games=1):
+        items = sorted((key, move, games, points) for (key, move), (games, points)
+                       in self.counts.items() if games >= min_games)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.size, self.max_ply, 0, len(items)))
+            for column, dtype in enumerate(("<u8", "<u2", "<u4", "<u4")):
+                f.write(np.array([item[column] for item in items], dtype=dtype).tobytes())
+        # replace in one step, an open memory map keeps the old file contents
+        os.replace(tmp, path)
+        open_book.cache_clear()
+        return len(items)
+
+
+def main(argv=None):
+    # the engine imports this module, so the CLI-only imports live here
+    import argparse
+    from gomoku.tournament import parse_engine, run_tournament
+
+    parser = argparse.ArgumentParser(description="Build or extend a Gomoku opening book")
+    parser.add_argument("book", help="book file to write")
+    parser.add_argument("inputs", nargs="*",
+                        help="tournament or analysis JSON lines, or .gmkr game records")
+    parser.add_argument("--size", type=int, default=15)
+    parser.add_argument("--max-ply", type=int, default=10, help="deepest position kept")
+    parser.add_argument("--min-games", type=int, default=1, help="drop rarer moves")
+    parser.add_argument("--extend", action="store_true", help="add to the existing book")
+    parser.add_argument("--self-play", type=int, default=0, metavar="GAMES",
+                        help="also play this many games and add them")
+    parser.add_argument("--engine", default="alpha-beta,depth=2", help="self-play engine")
+    parser.add_argument("--opening-plies", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    builder = BookBuilder(args.size, args.max_ply)
+    if args.extend and os.path.exists(args.book):
+        builder.load(args.book)
+    for path in args.inputs:
+        if path.endswith(".gmkr"):
+            from gomoku.records import read_records
+            for record in read_records(path):
+                builder.add_game_record(record)
+            continue
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    builder.add_record(json.loads(line))
+    if args.self_play:
+        engine = parse_engine(args.engine)
+        # book moves would only replay what the book already knows
+        engine.setdefault("use_book", False)
+        for record in run_tournament(args.self_play, args.size, engine, engine, args.workers,
+                                     opening_plies=args.opening_plies,
+                                     game_options={"backend": "bitboard", "incremental_eval": True}):
+            builder.add_game(record)
+    count = builder.write(args.book, args.min_games)
+    print(f"{args.book}: {count} entries, size {args.size}, up to ply {builder.max_ply}")
+
+
+if __name__ == "__main__":
+    main()
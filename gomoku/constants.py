@@ -0,0 +1,7 @@
+# Constants
+EMPTY = 0
+WHITE = 1  # AI
+BLACK = 2  # Human
+
+# the four line directions through a cell: row, column, diagonal, anti-diagonal
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
@@ -0,0 +1,226 @@
+"""Pattern-based static evaluation of search leaves.
+
+Every 5- and 6-cell window along rows, columns and both diagonals is scored
+in one batched NumPy pass. The window index arrays depend only on the board
+size and are built once per size.
+
+Run ``python -m gomoku.evaluation`` for an evaluations-per-second benchmark.
+"""
+from functools import lru_cache
+import time
+
+import numpy as np
+
+from gomoku.constants import EMPTY, WHITE, BLACK, DIRECTIONS
+
+# score of a search win; evaluations are clipped below it
+WIN_SCORE = 10000
+
+# 5-cell windows holding k stones of one color and none of the other
+FIVE_WEIGHTS = np.array([0, 1, 5, 30, 300, 5000])
+# 6-cell windows with both ends empty: open four _XXXX_, open or broken three
+# (_XXX__, _X_XX_, ...)
+OPEN_FOUR = 3000
+OPEN_THREE = 200
+
+
+@lru_cache(maxsize=None)
+def window_indices(size, length):
+    """Flat indices, shape (n_windows, length), of every window on the board."""
+    windows = []
+    for di, dj in DIRECTIONS:
+        for i in range(size):
+            for j in range(size):
+                end_i, end_j = i + di * (length - 1), j + dj * (length - 1)
+                if 0 <= end_i < size and 0 <= end_j < size:
+                    windows.append([(i + di * k) * size + j + dj * k for k in range(length)])
+    return np.array(windows, dtype=np.intp).reshape(-1, length)
+
+
+# each cell is encoded so that the sum over a window identifies how many
+# stones of each color it holds: white + 8 * black
+_CODES = np.zeros(3, dtype=np.int64)
+_CODES[WHITE] = 1
+_CODES[BLACK] = 8
+
+
+def _build_tables():
+    five = np.zeros(6 * 8, dtype=np.int64)
+    four = np.zeros(5 * 8, dtype=np.int64)
+    for white in range(6):
+        for black in range(6 - white):
+            code = white + 8 * black
+            if black == 0:
+                five[code] = FIVE_WEIGHTS[white]
+            elif white == 0:
+                five[code] = -FIVE_WEIGHTS[black]
+            if white + black <= 4:
+                if (white, black) == (4, 0):
+                    four[code] = OPEN_FOUR
+                elif (white, black) == (3, 0):
+                    four[code] = OPEN_THREE
+                elif (white, black) == (0, 4):
+                    four[code] = -OPEN_FOUR
+                elif (white, black) == (0, 3):
+                    four[code] = -OPEN_THREE
+    return five, four
+
+
+# white-minus-black score by window code, for 5-cell windows and for the
+# inner four cells of 6-cell windows with both ends empty
+FIVE_TABLE, OPEN_TABLE = _build_tables()
+
+
+def _white_minus_black(cells, size):
+    codes = _CODES[cells]
+    total = 0
+    idx5 = window_indices(size, 5)
+    if len(idx5):
+        total += int(FIVE_TABLE[codes[idx5].sum(axis=1)].sum())
+    idx6 = window_indices(size, 6)
+    if len(idx6):
+        w6 = codes[idx6]
+        open_ends = (w6[:, 0] + w6[:, 5]) == 0
+        total += int(OPEN_TABLE[w6[:, 1:5].sum(axis=1)][open_ends].sum())
+    return total
+
+
+# tables padded so that one more stone's code never indexes past the end
+_FIVE_PADDED = np.concatenate([FIVE_TABLE, np.zeros(8, dtype=np.int64)])
+_OPEN_PADDED = np.concatenate([OPEN_TABLE, np.zeros(8, dtype=np.int64)])
+
+
+@lru_cache(maxsize=None)
+def _gain_indices(size):
+    """Index arrays for move_gains: (5-cell windows, 6-cell windows, targets).
+
+    The window arrays are transposed, one row per position in the window,
+    so summing a window is a sum over rows. targets are the cells receiving
+    each window's change: per color the cells of every 5-cell window, the
+    inner cells of every 6-cell window, then its two end cells, with
+    black's copies offset by size * size so one bincount fills both grids.
+    """
+    n = size * size
+    idx5, idx6 = window_indices(size, 5), window_indices(size, 6)
+    one = np.concatenate([idx5.T.ravel(), idx6[:, 1:5].T.ravel(), idx6[:, [0, 5]].T.ravel()])
+    return (np.ascontiguousarray(idx5.T), np.ascontiguousarray(idx6.T),
+            np.concatenate([one, one + n]))
+
+
+def move_gains(matrix):
+    """(white, black) grids: what a stone of that color on each cell would add.
+
+    Both are changes of the white-minus-black pattern score with black's sign
+    flipped, so a larger value is a better move for that color (attack) and
+    a better block against it (defense). Occupied cells are 0. A stone
+    changes a window's score the same way whichever empty cell of it it
+    fills, so every window's change is computed once and spread over its
+    cells with one bincount.
+    """
+    size = matrix.shape[0]
+    n = size * size
+    cells = np.ascontiguousarray(matrix).ravel()
+    if size < 6:
+        return np.zeros((size, size), dtype=np.int64), np.zeros((size, size), dtype=np.int64)
+    idx5, idx6, targets = _gain_indices(size)
+    codes = _CODES[cells]
+    s5 = codes[idx5].sum(axis=0)
+    base5 = _FIVE_PADDED[s5]
+    w6 = codes[idx6]
+    open_ends = (w6[0] + w6[5]) == 0
+    s6 = w6[1:5].sum(axis=0)
+    base6 = _OPEN_PADDED[s6] * open_ends
+    white6 = _OPEN_PADDED[s6 + 1] * open_ends - base6
+    black6 = base6 - _OPEN_PADDED[s6 + 8] * open_ends
+    white5 = _FIVE_PADDED[s5 + 1] - base5
+    black5 = base5 - _FIVE_PADDED[s5 + 8]
+    # the targets run position by position, so each window's change is tiled;
+    # a stone on an end closes the window, whatever its color
+    weights = np.concatenate([np.tile(white5, 5), np.tile(white6, 4), np.tile(-base6, 2),
+                              np.tile(black5, 5), np.tile(black6, 4), np.tile(base6, 2)])
+    gains = np.bincount(targets, weights, 2 * n).astype(np.int64).reshape(2, n)
+    gains[:, cells != EMPTY] = 0
+    return gains[0].reshape(size, size), gains[1].reshape(size, size)
+
+
+def to_color_score(white_minus_black, color):
+    """Turn a white-minus-black total into color's clipped score."""
+    score = white_minus_black if color == WHITE else -white_minus_black
+    return max(-WIN_SCORE + 1, min(WIN_SCORE - 1, score))
+
+
+def evaluate_patterns(matrix, color):
+    """Static score of the position from color's point of view."""
+    cells = np.ascontiguousarray(matrix).ravel()
+    return to_color_score(_white_minus_black(cells, matrix.shape[0]), color)
+
+
+@lru_cache(maxsize=None)
+def board_lines(size):
+    """Flat cell indices of every row, column and diagonal long enough for five.
+
+    Every window scored by evaluate_patterns lies on exactly one of these
+    lines, so the sum of score_line over them equals the full evaluation.
+    """
+    lines = []
+    for di, dj in DIRECTIONS:
+        for i in range(size):
+            for j in range(size):
+                # start only at the first cell of each line
+                if 0 <= i - di < size and 0 <= j - dj < size:
+                    continue
+                line = []
+                x, y = i, j
+                while 0 <= x < size and 0 <= y < size:
+                    line.append(x * size + y)
+                    x, y = x + di, y + dj
+                if len(line) >= 5:
+                    lines.append(line)
+    return lines
+
+
+_CODE_LIST = _CODES.tolist()
+_FIVE_LIST = FIVE_TABLE.tolist()
+_OPEN_LIST = OPEN_TABLE.tolist()
+
+
+@lru_cache(maxsize=1 << 16)
+def score_line(cells):
+    """White-minus-black pattern score of one line, given as a tuple of cells."""
+    codes = [_CODE_LIST[c] for c in cells]
+    total = 0
+    for k in range(len(codes) - 4):
+        total += _FIVE_LIST[sum(codes[k:k + 5])]
+    for k in range(len(codes) - 5):
+        if codes[k] == 0 and codes[k + 5] == 0:
+            total += _OPEN_LIST[sum(codes[k + 1:k + 5])]
+    return total
+
+
+@lru_cache(maxsize=1 << 18)
+def bits_to_cells(white, black, length):
+    """Cells tuple of a line segment given as bit masks, bit k for cell k."""
+    return tuple(WHITE if white >> k & 1 else BLACK if black >> k & 1 else EMPTY
+                 for k in range(length))
+
+
+def benchmark(size, stones=40, positions=200, seed=0):
+    """Return evaluations per second over random positions."""
+    rng = np.random.default_rng(seed)
+    boards = []
+    for _ in range(positions):
+        cells = np.zeros(size * size, dtype=int)
+        occupied = rng.choice(size * size, stones, replace=False)
+        cells[occupied[::2]] = WHITE
+        cells[occupied[1::2]] = BLACK
+        boards.append(cells.reshape(size, size))
+    evaluate_patterns(boards[0], WHITE)  # build the index arrays outside the timing
+    start = time.perf_counter()
+    for board in boards:
+        evaluate_patterns(board, WHITE)
+    return positions / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    for size in (15, 19):
+        print(f"{size}x{size}: {benchmark(size):,.0f} evaluations/s")
@@ -0,0 +1,913 @@
+"""The Gomoku engine: board state, move generation and the searches.
+
+Shared by the CLI (Gomaku_game.py), the pygame UI (Gomaku_game_UI.py) and
+the headless tools in this package. It has no GUI dependencies, so worker
+processes and servers can import it without a display.
+"""
+import numpy as np
+import math
+import time
+from array import array
+
+from collections import defaultdict
+
+from gomoku.constants import EMPTY, WHITE, BLACK
+from gomoku.board import BACKENDS, UNBOUNDED, MATRIX_LIMIT
+from gomoku.zobrist import zobrist_keys, sparse_zobrist_keys
+from gomoku.transposition import TranspositionTable, EXACT, LOWER, UPPER, NO_MOVE
+from gomoku.stats import SearchStats
+from gomoku.threats import ThreatSolver, line_cells, five_cells
+from gomoku.book import open_book, book_path
+from gomoku.ordering import MoveOrdering, TACTICAL, cell_gains
+from gomoku.evaluation import (WIN_SCORE, evaluate_patterns, to_color_score, board_lines,
+                               score_line, bits_to_cells, move_gains)
+
+# half-width of the pvs root window around the expected score (see aspiration_root)
+ASPIRATION = 50
+# late-move reductions: plies taken off a late quiet move, and the least
+# remaining depth at which moves are reduced (see reduce_from)
+LMR_REDUCTION = 1
+LMR_DEPTH = 2
+# mixed into the transposition-table key once per quiescence ply, so scores
+# searched with one quiescence depth are never taken for another's
+QUIESCENCE_KEY = 0x9E3779B97F4A7C15
+
+#raised inside the search when the time budget of ai_move runs out
+class SearchTimeout(Exception):
+    pass
+
+
+class Game:
+    def __init__(self, size=5, backend="matrix", tt_size_mb=16, radius=2, evaluator=None,
+                 incremental_eval=False, debug_eval=False, book=None, ordering="history"):
+        # constructor settings, so a copy can be rebuilt elsewhere (see compact_state)
+        self.config = dict(backend=backend, tt_size_mb=tt_size_mb, radius=radius,
+                           evaluator=evaluator, incremental_eval=incremental_eval,
+                           debug_eval=debug_eval, book=book, ordering=ordering)
+        # backend is "matrix" (NumPy cells), "bitboard" (big-int per color) or
+        # "sparse" (only the occupied cells, see gomoku.board.SparseBoard);
+        # a sparse board of size None is unbounded
+        self.sparse = backend == "sparse"
+        if size is None:
+            if not self.sparse:
+                raise ValueError("only a sparse board can be unbounded")
+            size = UNBOUNDED
+        if self.sparse and not radius:
+            raise ValueError("a sparse board needs a candidate radius")
+        self.board = BACKENDS[backend](size)
+        self.size = size
+        self.empty_count = size * size
+        self.winner = EMPTY
+        # stack of (i, j, color, winner before the move) so undo_move restores the state
+        self.history = []
+        # Zobrist hash of the stones on the board, updated by make/undo_move
+        self.zobrist, self.zobrist_extra = (sparse_zobrist_keys if self.sparse else zobrist_keys)(size)
+        self.hash = 0
+        # created on the first alpha-beta search and kept for the whole game
+        self.tt_size_mb = tt_size_mb
+        self.tt = None
+        # perf_counter() deadline of a time-controlled ai_move, None for fixed depth
+        self.deadline = None
+        # set (possibly from another thread) to end the running search early
+        self.stop = False
+        # search extensions, set by ai_move: plies of forcing moves searched
+        # past the horizon (see quiesce) and the number of moves searched at
+        # full depth before later ones are reduced (see reduce_from); 0 is off
+        self.quiescence = 0
+        self.lmr = 0
+        # background search of the opponent's replies (see ai_move's ponder)
+        self.ponderer = None
+        # (depth, best move) of the last finished root search, for progress
+        # displays reading it from another thread
+        self.progress = None
+        # search nodes visited so far, for nodes-per-second reporting
+        self.nodes = 0
+        # SearchStats of the running instrumented ai_move, otherwise None
+        self.stats = None
+        self.last_stats = None
+        # root score of each color's last search, the next pvs aspiration guess
+        self.root_scores = {}
+        # candidate moves: empty cells within radius of a stone, kept up to
+        # date by make/undo_move (radius None searches every empty cell)
+        self.radius = radius
+        if self.sparse:
+            self.near = defaultdict(lambda: defaultdict(int))
+        else:
+            self.near = [[0] * size for _ in range(size)]
+        self.candidates = set()
+        # static evaluation of search leaves, evaluator(matrix, color) -> int;
+        # None scores every undecided leaf as 0
+        self.evaluator = evaluator
+        # incremental pattern evaluation: a cached score per row, column and
+        # diagonal, rescored only for the four lines through each move;
+        # debug_eval checks the running total against a full evaluation;
+        # sparse boards always evaluate incrementally, rescoring the cells
+        # around each move instead of whole lines (see update_segments)
+        self.incremental_eval = incremental_eval or self.sparse
+        self.debug_eval = debug_eval
+        if self.incremental_eval and self.sparse:
+            self.eval_total = 0
+        elif incremental_eval:
+            self.lines = [[EMPTY] * len(line) for line in board_lines(size)]
+            self.line_scores = [0] * len(self.lines)
+            self.cell_lines = [[] for _ in range(size * size)]
+            for lid, line in enumerate(board_lines(size)):
+                for pos, cell in enumerate(line):
+                    self.cell_lines[cell].append((lid, pos))
+            self.eval_total = 0
+        # opening book (gomoku.book), memory-mapped once per file: None uses
+        # books/<size>.book when it exists, False disables it, else a path
+        self.book = None if book is False else open_book(book_path(size) if book is None else book)
+        # alpha-beta move ordering: "history" (tactics, killers and history,
+        # see gomoku.ordering) or "neighbors" (occupied-neighbor count only)
+        self.ordering = MoveOrdering(size) if ordering == "history" else None
+        # Monte Carlo search tree, kept between moves (see gomoku.mcts)
+        self.mcts = None
+
+#matrix view of the board, live for "matrix" and a snapshot for "bitboard"
+    @property
+    def matrix(self):
+        return self.board.matrix
+#prints the current board; a sparse board only around its stones, with the
+#last two digits of each column number
+    def print_board(self):
+        if self.sparse:
+            rows, cols = self.board.extent(margin=2)
+        else:
+            rows = cols = range(self.size)
+        width = len(str(rows[-1]))
+        get = self.board.get
+        print(" " * width + " " + " ".join(f"{j % 100:2}" for j in cols))
+        for i in rows:
+            row_str = f"{i:{width}} "
+            for j in cols:
+                cell = get(i, j)
+                if cell == WHITE:
+                    row_str += "⚪ "
+                elif cell == BLACK:
+                    row_str += "⚫ "
+                else:
+                    row_str += "_  "
+            print(row_str)
+        print()
+#check if there is a winner in in a single row, column or diagonal
+    def check_row_win(self, color):
+        for i in range(self.size):
+            for j in range(self.size - 4):
+                if np.array_equal(self.matrix[i, j:j + 5], np.full(5, color)):
+                    return True
+        return False
+
+    def check_col_win(self, color):
+        for j in range(self.size):
+            for i in range(self.size - 4):
+                if np.array_equal(self.matrix[i:i + 5, j], np.full(5, color)):
+                    return True
+        return False
+
+    def check_diagonal_win(self, color):
+        for i in range(self.size - 4):
+            for j in range(self.size - 4):
+                if all(self.matrix[i + k, j + k] == color for k in range(5)):
+                    return True
+                if all(self.matrix[i + 4 - k, j + k] == color for k in range(5)):
+                    return True
+        return False
+
+#check only the lines through (i, j) for five in a row of color
+    def is_five(self, i, j, color):
+        return self.board.is_five(i, j, color)
+
+#place a stone and update the winner / empty counter from the last move only
+    def make_move(self, i, j, color):
+        self.board.place(i, j, color)
+        self.empty_count -= 1
+        self.hash ^= self.zobrist[i * self.size + j][color]
+        self.history.append((i, j, color, self.winner))
+        if self.sparse:
+            self.update_segments(i, j, EMPTY, color)
+        elif self.incremental_eval:
+            self.update_lines(i, j, color)
+        if self.radius:
+            self.candidates.discard((i, j))
+            r = self.radius
+            for x in range(max(i - r, 0), min(i + r + 1, self.size)):
+                row = self.near[x]
+                for y in range(max(j - r, 0), min(j + r + 1, self.size)):
+                    row[y] += 1
+                    # a cell with no stone nearby was empty, unless it is (i, j)
+                    if row[y] == 1 and (x != i or y != j):
+                        self.candidates.add((x, y))
+        if self.winner == EMPTY and self.is_five(i, j, color):
+            self.winner = color
+
+    def undo_move(self):
+        i, j, color, self.winner = self.history.pop()
+        self.board.remove(i, j)
+        self.empty_count += 1
+        self.hash ^= self.zobrist[i * self.size + j][color]
+        if self.sparse:
+            self.update_segments(i, j, color, EMPTY)
+        elif self.incremental_eval:
+            self.update_lines(i, j, EMPTY)
+        if self.radius:
+            r = self.radius
+            for x in range(max(i - r, 0), min(i + r + 1, self.size)):
+                row = self.near[x]
+                for y in range(max(j - r, 0), min(j + r + 1, self.size)):
+                    row[y] -= 1
+                    if row[y] == 0:
+                        self.candidates.discard((x, y))
+            if self.near[i][j]:
+                self.candidates.add((i, j))
+
+#rescore the lines through (i, j) after it changed to color
+    def update_lines(self, i, j, color):
+        for lid, pos in self.cell_lines[i * self.size + j]:
+            line = self.lines[lid]
+            line[pos] = color
+            score = score_line(tuple(line))
+            self.eval_total += score - self.line_scores[lid]
+            self.line_scores[lid] = score
+
+#sparse incremental evaluation: every window through (i, j) lies within five
+#cells of it, so rescoring those 11 cells with (i, j) as old and as new gives
+#the change of the whole line's score
+    def update_segments(self, i, j, old, new):
+        for direction in range(4):
+            white, black, length, pos = self.board.segment(i, j, direction, 5)
+            bit = 1 << pos
+            white &= ~bit
+            black &= ~bit
+            before = score_line(bits_to_cells(white | bit * (old == WHITE),
+                                              black | bit * (old == BLACK), length))
+            after = score_line(bits_to_cells(white | bit * (new == WHITE),
+                                             black | bit * (new == BLACK), length))
+            self.eval_total += after - before
+
+#small picklable snapshot: size, settings and the moves as packed ints
+    def compact_state(self):
+        moves = array("I", ((i * self.size + j) << 2 | color for i, j, color, _ in self.history))
+        return self.size, self.config, moves.tobytes()
+
+#replay a compact_state onto this game, keeping its transposition table
+    def load_state(self, state):
+        while self.history:
+            self.undo_move()
+        moves = array("I")
+        moves.frombytes(state[2])
+        for code in moves:
+            i, j = divmod(code >> 2, self.size)
+            self.make_move(i, j, code & 3)
+
+    @classmethod
+    def from_state(cls, state):
+        size, config, _ = state
+        game = cls(size, **config)
+        game.load_state(state)
+        return game
+
+#copy for searching in another thread, sharing the transposition table, move
+#ordering, root scores and Monte Carlo tree with this game (only one of them
+#may search at a time); the tree is only made by an MCTS search, so a copy
+#that makes one hands it back through keep_tree
+    def search_copy(self):
+        copy = Game.from_state(self.compact_state())
+        if self.tt is None:
+            self.tt = TranspositionTable(self.tt_size_mb)
+        copy.tt = self.tt
+        copy.ordering = self.ordering
+        copy.root_scores = self.root_scores
+        copy.mcts = self.mcts
+        return copy
+
+#take over the Monte Carlo tree a search_copy grew, once it is done searching
+    def keep_tree(self, copy):
+        if self.mcts is None:
+            self.mcts = copy.mcts
+
+#check if there is a winner in general (kept up to date by make_move)
+    def is_winner(self, color):
+        return self.winner == color
+
+#full-board scan, for positions not built through make_move
+    def scan_winner(self, color):
+        if self.sparse:
+            return self.board.has_five(color)
+        return (self.check_row_win(color) or
+                self.check_col_win(color) or
+                self.check_diagonal_win(color))
+# check for a deraw
+    def is_draw(self):
+        return self.empty_count == 0
+
+#empty cells near a stone (sorted so the order does not depend on the
+#make/undo history), the center on an empty board
+    def get_all_valid_moves(self):
+        if not self.radius:
+            return self.board.empty_cells()
+        if self.candidates:
+            return sorted(self.candidates)
+        if self.empty_count == self.size * self.size:
+            return [(self.size // 2, self.size // 2)]
+        return self.board.empty_cells()
+                            
+    def heuristic_sort_moves(self, moves):
+        def count_neighbors(move):
+            return self.board.count_neighbors(move[0], move[1])
+        return sorted(moves, key=count_neighbors, reverse=True)
+
+#moves for color to play, best first; tt_move (a cell index) goes first
+    def order_moves(self, moves, color, tt_move=NO_MOVE):
+        if self.ordering is not None:
+            return self.ordering.order(self, moves, color, tt_move)
+        moves = self.heuristic_sort_moves(moves)
+        if tt_move != NO_MOVE:
+            first = divmod(tt_move, self.size)
+            if first in moves:
+                moves.remove(first)
+                moves.insert(0, first)
+        return moves
+
+#grid of what a stone on each cell would add for its own side (attack) plus
+#what it would take from the opponent (defense), 0 on occupied cells; the
+#whole board is scored at once (gomoku.evaluation.move_gains)
+    def move_scores(self):
+        white, black = move_gains(self.matrix)
+        return white + black
+
+#the k candidate moves with the best move_scores as [((i, j), score)], best
+#first, ties in board order
+    def top_moves(self, k=10):
+        grid = self.move_scores()
+        scored = [((i, j), int(grid[i, j])) for i, j in self.get_all_valid_moves()]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:k]
+
+    def check_time(self):
+        if self.stop or (self.deadline is not None and time.perf_counter() > self.deadline):
+            raise SearchTimeout
+
+#end pondering, e.g. when the game is over
+    def stop_pondering(self):
+        if self.ponderer is not None:
+            self.ponderer.stop()
+            self.ponderer = None
+
+#leaf score from color's point of view
+    def evaluate(self, color):
+        if self.incremental_eval:
+            if self.debug_eval:
+                full = evaluate_patterns(self.matrix, WHITE)
+                assert to_color_score(self.eval_total, WHITE) == full, (
+                    f"incremental evaluation {self.eval_total} != full evaluation {full}")
+            return to_color_score(self.eval_total, color)
+        if self.evaluator is None:
+            return 0
+        return self.evaluator(self.matrix, color)
+
+#scores are from WHITE's point of view
+    def minimax(self, depth, is_maximizing):
+        self.nodes += 1
+        self.check_time()
+        if self.winner != EMPTY or depth == 0 or self.is_draw():
+            if self.stats is not None:
+                self.stats.leaves += 1
+            if self.is_winner(WHITE):
+                return WIN_SCORE + depth  # prefer the quickest win
+            elif self.is_winner(BLACK):
+                return -WIN_SCORE - depth
+            elif self.is_draw():
+                return 0
+            return self.evaluate(WHITE)
+
+        if is_maximizing:
+            best_score = -math.inf
+            for i, j in self.get_all_valid_moves():
+                self.make_move(i, j, WHITE)
+                score = self.minimax(depth - 1, False)
+                self.undo_move()
+                best_score = max(score, best_score)
+            return best_score
+        else:
+            best_score = math.inf
+            for i, j in self.get_all_valid_moves():
+                self.make_move(i, j, BLACK)
+                score = self.minimax(depth - 1, True)
+                self.undo_move()
+                best_score = min(score, best_score)
+            return best_score
+
+
+    def alpha_beta_minimax(self,alpha,beta, depth,color, is_maximizing):
+        self.nodes += 1
+        self.check_time()
+        opponent= BLACK if color == WHITE else WHITE
+        if self.winner != EMPTY or depth == 0 or self.is_draw():
+            if self.stats is not None:
+                self.stats.leaves += 1
+            if self.quiescence and self.winner == EMPTY and not self.is_draw():
+                return self.quiesce(alpha, beta, self.quiescence, color, is_maximizing)
+            if self.is_winner(color):
+                return WIN_SCORE + depth  # prefer the quickest win
+            elif self.is_winner(opponent):
+                return -WIN_SCORE - depth
+            elif self.is_draw():
+                return 0
+            return self.evaluate(color)
+
+        key, tt_move, tt_score = self.probe_tt(alpha, beta, depth, color, is_maximizing)
+        if tt_score is not None:
+            return tt_score
+        alpha_orig, beta_orig = alpha, beta
+
+        # the best move from an earlier search of this position goes first
+        moves = self.order_moves(self.get_all_valid_moves(), color if is_maximizing else opponent,
+                                 tt_move)
+        late = self.reduce_from(moves, depth, tt_move)
+        best_move = NO_MOVE
+        if is_maximizing:
+            best_score = -math.inf
+            for n, (i, j) in enumerate(moves):
+                self.make_move(i, j, color)
+                if n >= late:
+                    # a late quiet move: a reduced null-window search first,
+                    # the full search only if it might raise alpha
+                    score = self.alpha_beta_minimax(alpha, alpha + 1, depth - 1 - LMR_REDUCTION,
+                                                    color, False)
+                    if self.stats is not None:
+                        self.stats.reductions += 1
+                        self.stats.reduction_researches += score > alpha
+                    if score > alpha:
+                        score = self.alpha_beta_minimax(alpha,beta,depth-1,color, False)
+                else:
+                    score = self.alpha_beta_minimax(alpha,beta,depth-1,color, False)
+                self.undo_move()
+                if score> alpha:
+                    alpha = score
+                if score > best_score:
+                    best_score = score
+                    best_move = i * self.size + j
+                if score >= beta:
+                    if self.stats is not None:
+                        self.stats.cutoff(n)
+                    if self.ordering is not None:
+                        self.ordering.cutoff(self, i, j, color, depth)
+                    break
+        else:
+            best_score = math.inf
+            for n, (i, j) in enumerate(moves):
+                self.make_move(i, j, opponent)
+                if n >= late:
+                    score = self.alpha_beta_minimax(beta - 1, beta, depth - 1 - LMR_REDUCTION,
+                                                    color, True)
+                    if self.stats is not None:
+                        self.stats.reductions += 1
+                        self.stats.reduction_researches += score < beta
+                    if score < beta:
+                        score = self.alpha_beta_minimax(alpha,beta,depth - 1,color, True)
+                else:
+                    score = self.alpha_beta_minimax(alpha,beta,depth - 1,color, True)
+                self.undo_move()
+                if score < beta:
+                    beta = score
+                if score < best_score:
+                    best_score = score
+                    best_move = i * self.size + j
+                if score <= alpha:
+                    if self.stats is not None:
+                        self.stats.cutoff(n)
+                    if self.ordering is not None:
+                        self.ordering.cutoff(self, i, j, opponent, depth)
+                    break
+
+        self.store_tt(key, depth, best_score, best_move, alpha_orig, beta_orig)
+        return best_score
+
+#principal variation search: the same scores as alpha_beta_minimax, but only
+#the first (best ordered) move gets the full window; the others are tried
+#with a null window and searched again only when they might be better
+    def pvs(self, alpha, beta, depth, color, is_maximizing):
+        self.nodes += 1
+        self.check_time()
+        opponent = BLACK if color == WHITE else WHITE
+        if self.winner != EMPTY or depth == 0 or self.is_draw():
+            if self.stats is not None:
+                self.stats.leaves += 1
+            if self.quiescence and self.winner == EMPTY and not self.is_draw():
+                return self.quiesce(alpha, beta, self.quiescence, color, is_maximizing)
+            if self.is_winner(color):
+                return WIN_SCORE + depth  # prefer the quickest win
+            elif self.is_winner(opponent):
+                return -WIN_SCORE - depth
+            elif self.is_draw():
+                return 0
+            return self.evaluate(color)
+
+        key, tt_move, tt_score = self.probe_tt(alpha, beta, depth, color, is_maximizing)
+        if tt_score is not None:
+            return tt_score
+        alpha_orig, beta_orig = alpha, beta
+
+        moves = self.order_moves(self.get_all_valid_moves(), color if is_maximizing else opponent,
+                                 tt_move)
+        late = self.reduce_from(moves, depth, tt_move)
+        best_move = NO_MOVE
+        if is_maximizing:
+            best_score = -math.inf
+            for n, (i, j) in enumerate(moves):
+                self.make_move(i, j, color)
+                if n == 0:
+                    score = self.pvs(alpha, beta, depth - 1, color, False)
+                else:
+                    if n >= late:
+                        score = self.pvs(alpha, alpha + 1, depth - 1 - LMR_REDUCTION, color, False)
+                        if self.stats is not None:
+                            self.stats.reductions += 1
+                            self.stats.reduction_researches += score > alpha
+                    if n < late or score > alpha:
+                        score = self.pvs(alpha, alpha + 1, depth - 1, color, False)
+                    if alpha < score < beta:
+                        if self.stats is not None:
+                            self.stats.researches += 1
+                        score = self.pvs(alpha, beta, depth - 1, color, False)
+                self.undo_move()
+                if score > alpha:
+                    alpha = score
+                if score > best_score:
+                    best_score = score
+                    best_move = i * self.size + j
+                if score >= beta:
+                    if self.stats is not None:
+                        self.stats.cutoff(n)
+                    if self.ordering is not None:
+                        self.ordering.cutoff(self, i, j, color, depth)
+                    break
+        else:
+            best_score = math.inf
+            for n, (i, j) in enumerate(moves):
+                self.make_move(i, j, opponent)
+                if n == 0:
+                    score = self.pvs(alpha, beta, depth - 1, color, True)
+                else:
+                    if n >= late:
+                        score = self.pvs(beta - 1, beta, depth - 1 - LMR_REDUCTION, color, True)
+                        if self.stats is not None:
+                            self.stats.reductions += 1
+                            self.stats.reduction_researches += score < beta
+                    if n < late or score < beta:
+                        score = self.pvs(beta - 1, beta, depth - 1, color, True)
+                    if alpha < score < beta:
+                        if self.stats is not None:
+                            self.stats.researches += 1
+                        score = self.pvs(alpha, beta, depth - 1, color, True)
+                self.undo_move()
+                if score < beta:
+                    beta = score
+                if score < best_score:
+                    best_score = score
+                    best_move = i * self.size + j
+                if score <= alpha:
+                    if self.stats is not None:
+                        self.stats.cutoff(n)
+                    if self.ordering is not None:
+                        self.ordering.cutoff(self, i, j, opponent, depth)
+                    break
+
+        self.store_tt(key, depth, best_score, best_move, alpha_orig, beta_orig)
+        return best_score
+
+#quiescence search below the horizon, for at most depth more plies: only
+#forcing moves around the last move are played (see forcing_moves), and the
+#side to move may stand pat on the static evaluation instead, unless the last
+#move threatens five and has to be answered (gomoku.threats.five_cells);
+#scores are from color's point of view
+    def quiesce(self, alpha, beta, depth, color, is_maximizing):
+        self.nodes += 1
+        self.check_time()
+        if self.stats is not None:
+            self.stats.quiescence_nodes += 1
+        opponent = BLACK if color == WHITE else WHITE
+        if self.is_winner(color):
+            return WIN_SCORE
+        elif self.is_winner(opponent):
+            return -WIN_SCORE
+        elif self.is_draw():
+            return 0
+        stand_pat = self.evaluate(color)
+        if depth == 0:
+            return stand_pat
+        mover, waiting = (color, opponent) if is_maximizing else (opponent, color)
+        i, j, _, _ = self.history[-1]
+        blocks = five_cells(self.board, self.size, i, j, waiting)
+        if not blocks:
+            if is_maximizing and stand_pat >= beta or not is_maximizing and stand_pat <= alpha:
+                return stand_pat
+        # a four of the mover's left standing by the last move wins
+        if len(self.history) > 1:
+            x, y, _, _ = self.history[-2]
+            if five_cells(self.board, self.size, x, y, mover):
+                return WIN_SCORE if is_maximizing else -WIN_SCORE
+        if blocks:
+            moves = blocks
+            best_score = -math.inf if is_maximizing else math.inf
+        else:
+            moves = self.forcing_moves()
+            if not moves:
+                return stand_pat
+            best_score = stand_pat
+            if is_maximizing:
+                alpha = max(alpha, stand_pat)
+            else:
+                beta = min(beta, stand_pat)
+        for i, j in moves:
+            self.make_move(i, j, mover)
+            score = self.quiesce(alpha, beta, depth - 1, color, not is_maximizing)
+            self.undo_move()
+            if is_maximizing:
+                best_score = max(best_score, score)
+                alpha = max(alpha, score)
+            else:
+                best_score = min(best_score, score)
+                beta = min(beta, score)
+            if alpha >= beta:
+                break
+        return best_score
+
+#forcing moves after the last move: the empty cells within four steps of it
+#on its four lines (where it made a threat, and where that threat is blocked)
+#on which either side would gain at least TACTICAL, a four or an open three
+#(see gomoku.ordering), the strongest first; only those cells are scored, so
+#it works on unbounded boards too (they always evaluate incrementally)
+    def forcing_moves(self):
+        i, j, _, _ = self.history[-1]
+        cells = line_cells(self.board, self.size, i, j)
+        if self.incremental_eval:
+            gains = [max(cell_gains(self, x, y)) for x, y in cells]
+        else:
+            white, black = move_gains(self.matrix)
+            gains = [max(white[x, y], black[x, y]) for x, y in cells]
+        forcing = [(gain, cell) for gain, cell in zip(gains, cells) if gain >= TACTICAL]
+        forcing.sort(key=lambda item: item[0], reverse=True)
+        return [cell for _, cell in forcing]
+
+#index of the first move late-move reductions apply to: past the first lmr
+#moves and past every move the ordering put in front for a reason (the tt
+#move, tactical moves, killers); len(moves) when nothing is reduced
+    def reduce_from(self, moves, depth, tt_move):
+        if not self.lmr or depth < LMR_DEPTH:
+            return len(moves)
+        if self.ordering is not None:
+            return max(self.lmr, self.ordering.leading)
+        return max(self.lmr, int(tt_move != NO_MOVE))
+
+#does a child of this node (late-move reductions included) end in the
+#quiescence search? quiesce reads the move before the last one, so the score
+#of such a node depends on the move that led to it, not only on the position
+    def above_quiescence(self, depth):
+        if not self.quiescence:
+            return False
+        reduction = LMR_REDUCTION if self.lmr and depth >= LMR_DEPTH else 0
+        return depth - 1 - reduction <= 0
+
+#transposition-table probe for a search node: (key, tt_move, score), where
+#score is None unless the stored entry already decides the node
+    def probe_tt(self, alpha, beta, depth, color, is_maximizing):
+        # scores are from color's point of view, so the key covers both the
+        # perspective and the side to move, and the quiescence depth
+        key = self.hash ^ self.zobrist_extra[color]
+        if is_maximizing:
+            key ^= self.zobrist_extra[EMPTY]
+        if self.quiescence:
+            key ^= self.quiescence * QUIESCENCE_KEY & 0xFFFFFFFFFFFFFFFF
+        if self.tt is None or self.above_quiescence(depth):
+            return key, NO_MOVE, None
+        entry = self.tt.probe(key)
+        if self.stats is not None:
+            self.stats.tt_probes += 1
+            self.stats.tt_hits += entry is not None
+        if entry is None:
+            return key, NO_MOVE, None
+        tt_depth, tt_score, tt_flag, tt_move = entry
+        # only same-depth entries cut off, so the result is the plain
+        # depth-limited value whatever order the tree was searched
+        # in (the root-parallel search returns the serial move)
+        if tt_depth == depth:
+            if (tt_flag == EXACT or (tt_flag == LOWER and tt_score >= beta) or
+                    (tt_flag == UPPER and tt_score <= alpha)):
+                return key, tt_move, tt_score
+        return key, tt_move, None
+
+    def store_tt(self, key, depth, best_score, best_move, alpha_orig, beta_orig):
+        if self.tt is not None and not self.above_quiescence(depth):
+            if best_score <= alpha_orig:
+                flag = UPPER
+            elif best_score >= beta_orig:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.tt.store(key, depth, best_score, flag, best_move)
+
+
+#score every root move with a search of the given depth below it; alpha-beta
+#searches later moves with alpha one below the best score so far, so ties
+#still get exact scores and the first best move wins (as in gomoku.parallel)
+#pvs searches in an aspiration window around guess, the expected score
+    def search_root(self, moves, ai_type, color, depth, guess=None):
+        if ai_type == "pvs":
+            return self.aspiration_root(moves, color, depth, guess)
+        best_score = -math.inf
+        best_move = None
+        for i, j in moves:
+            self.make_move(i, j, color)
+            if ai_type == "minimax":
+                score = self.minimax(depth, color == BLACK)
+                if color == BLACK:
+                    score = -score
+            else:
+                score = self.alpha_beta_minimax(best_score - 1,math.inf,depth,color,False)  # Alpha-Beta pruning
+            self.undo_move()
+            if score > best_score:
+                best_score = score
+                best_move = (i, j)
+        return best_score, best_move
+
+#pvs root: the first move with the (alpha, beta) window, the rest with a null
+#window above the best score so far; a score <= alpha or >= beta means the
+#window failed and the score is only a bound
+    def pvs_root(self, moves, color, depth, alpha=-math.inf, beta=math.inf):
+        best_score = -math.inf
+        best_move = None
+        for i, j in moves:
+            self.make_move(i, j, color)
+            if best_move is None:
+                score = self.pvs(alpha, beta, depth, color, False)
+            else:
+                bound = max(alpha, best_score)
+                score = self.pvs(bound, bound + 1, depth, color, False)
+                if bound < score < beta:
+                    if self.stats is not None:
+                        self.stats.researches += 1
+                    score = self.pvs(bound, beta, depth, color, False)
+            self.undo_move()
+            if score > best_score:
+                best_score = score
+                best_move = (i, j)
+            if score >= beta:
+                break
+        return best_score, best_move
+
+#pvs root search in a window of +-ASPIRATION around guess; a side that fails
+#is opened up to infinity and the root searched again
+    def aspiration_root(self, moves, color, depth, guess):
+        if guess is None or abs(guess) >= WIN_SCORE:
+            return self.pvs_root(moves, color, depth)
+        alpha, beta = guess - ASPIRATION, guess + ASPIRATION
+        while True:
+            best_score, best_move = self.pvs_root(moves, color, depth, alpha, beta)
+            if best_score <= alpha:
+                alpha = -math.inf
+            elif best_score >= beta:
+                beta = math.inf
+            else:
+                return best_score, best_move
+            if self.stats is not None:
+                self.stats.aspiration_fails += 1
+
+#ai_type is "minimax", "alpha-beta", "pvs" (principal variation search
+#with aspiration windows around the previous score) or "mcts" (Monte Carlo
+#tree search, see gomoku.mcts; it ignores depth and spends time_limit or
+#playouts, by default mcts.PLAYOUTS)
+#depth is the search depth below each root move; with time_limit (seconds)
+#the search deepens 0, 1, 2, ... until the budget runs out instead
+#workers > 1 spreads the root moves over a process pool (gomoku.parallel)
+#with_stats returns (move, SearchStats); on_stats(stats) is called after the
+#search and trace_path appends the stats as a JSON line (any of the three
+#turns instrumentation on, see gomoku.stats)
+#threat_search runs the threat-space solver first (gomoku.threats) with its
+#own node and time budget; a forced win or block is played without searching
+#use_book plays a move from the opening book when the position is in it
+#ponder keeps searching the opponent's likely replies in the background after
+#the move (gomoku.ponder), for at most ponder_seconds; if the next ai_move
+#finds the reply already answered, that answer is played straight away
+#root_width searches only the root_width root moves with the best move_scores
+#quiescence (plies) extends alpha-beta and pvs leaves with forcing moves, and
+#lmr (moves) searches the quiet moves after the first lmr moves of a node one
+#ply shallower, again at full depth when they turn out better (both 0 = off)
+    def ai_move(self, ai_type="minimax",color=WHITE, depth=2, time_limit=None, workers=None,
+                with_stats=False, on_stats=None, trace_path=None,
+                threat_search=True, threat_nodes=20000, threat_time=None, threat_threes=False,
+                use_book=True, ponder=False, ponder_replies=3, ponder_seconds=30.0,
+                root_width=None, playouts=None, quiescence=0, lmr=0):
+        self.quiescence, self.lmr = quiescence, lmr
+        pondered = None
+        if self.ponderer is not None:
+            pondered = self.ponderer.result_for(self, ai_type, color, depth, time_limit,
+                                                (quiescence, lmr))
+            self.ponderer = None
+        if with_stats or on_stats is not None or trace_path is not None:
+            self.stats = SearchStats(ai_type, color, len(self.history))
+            self.stats.ponder_hit = pondered is not None
+        start, start_nodes = time.perf_counter(), self.nodes
+        best_score = None
+        forced = pondered
+        if forced is None and use_book and self.book is not None:
+            forced = self.book.lookup(self, color)
+            if self.stats is not None:
+                self.stats.book = forced is not None
+        if forced is None and threat_search:
+            if threat_time is None and time_limit is not None:
+                threat_time = time_limit / 4
+            solver = ThreatSolver(self, threat_nodes, threat_time, threat_threes)
+            forced = solver.solve(color)
+            self.nodes += solver.nodes
+            if self.stats is not None:
+                self.stats.threat_nodes = solver.nodes
+                self.stats.threat_result = solver.result
+            if time_limit is not None:
+                time_limit = max(time_limit - (time.perf_counter() - start), 0)
+        if ai_type in ("alpha-beta", "pvs"):
+            # the table is reused across moves, older entries age out
+            if self.tt is None:
+                self.tt = TranspositionTable(self.tt_size_mb)
+            self.tt.new_search()
+            if self.ordering is not None:
+                self.ordering.new_search()
+        moves = self.order_moves(self.get_all_valid_moves(), color)
+        if root_width is not None and len(moves) > root_width:
+            keep = {move for move, _ in self.top_moves(root_width)}
+            moves = [move for move in moves if move in keep]
+
+        if forced is not None:
+            best_move = forced
+        elif ai_type == "mcts":
+            from gomoku.mcts import MCTS
+            if self.size > MATRIX_LIMIT:
+                # playouts fill every empty cell of the board
+                raise ValueError(f"MCTS does not play on a {self.size}x{self.size} board")
+            if self.mcts is None:
+                self.mcts = MCTS(self.size)
+            best_move = self.mcts.search(self, color, time_limit, playouts)
+            if self.stats is not None:
+                self.stats.playouts = self.mcts.playouts
+        elif workers and workers > 1:
+            # imported here so single-process users skip multiprocessing
+            from gomoku.parallel import parallel_ai_move
+            best_move = parallel_ai_move(self, moves, ai_type, color, depth, time_limit, workers)
+        elif time_limit is None:
+            best_score, best_move = self.search_root(moves, ai_type, color, depth,
+                                                     self.root_scores.get(color))
+            self.progress = (depth, best_move)
+            if self.stats is not None:
+                self.stats.finish_depth(depth, time.perf_counter() - start, self.nodes - start_nodes)
+        else:
+            best_move = moves[0] if moves else None
+            plies = len(self.history)
+            self.deadline = time.perf_counter() + time_limit
+            guess = self.root_scores.get(color)
+            try:
+                for d in range(self.empty_count):
+                    depth_start, depth_nodes = time.perf_counter(), self.nodes
+                    best_score, best_move = self.search_root(moves, ai_type, color, d, guess)
+                    guess = best_score
+                    self.progress = (d, best_move)
+                    if self.stats is not None:
+                        self.stats.finish_depth(d, time.perf_counter() - depth_start,
+                                                self.nodes - depth_nodes)
+                    if abs(best_score) >= WIN_SCORE:
+                        break
+                    # search the previous iteration's best move first next time
+                    moves.remove(best_move)
+                    moves.insert(0, best_move)
+            except SearchTimeout:
+                # unwind the moves left on the board by the aborted iteration
+                while len(self.history) > plies:
+                    self.undo_move()
+            finally:
+                self.deadline = None
+
+        if best_score is not None:
+            self.root_scores[color] = best_score
+        if best_move:
+            self.make_move(best_move[0], best_move[1], color)  # Corrected placement
+            if ponder and self.winner == EMPTY and not self.is_draw():
+                from gomoku.ponder import Ponderer
+                self.ponderer = Ponderer(self, ai_type, color, depth, time_limit,
+                                         ponder_replies, ponder_seconds,
+                                         (quiescence, lmr)).start()
+
+        stats, self.stats = self.stats, None
+        if stats is None:
+            return best_move
+        stats.seconds = time.perf_counter() - start
+        stats.nodes = self.nodes - start_nodes
+        stats.move = best_move
+        stats.score = best_score
+        self.last_stats = stats
+        if on_stats is not None:
+            on_stats(stats)
+        if trace_path is not None:
+            stats.write_trace(trace_path)
+        if with_stats:
+            return best_move, stats
+        return best_move
@@ -0,0 +1,227 @@
+"""Monte Carlo tree search (UCT) with batched NumPy playouts.
+
+Every iteration walks the tree by UCB1 from the root, adds one child and
+runs a whole batch of playouts from the new position at once. A playout
+fills the empty cells in a random order, the colors alternating, and the
+winner is the first color to complete five. The batch is done with array
+operations over all playouts together:
+
+1. every playout's fill order is a sort of random keys, giving the move
+   number at which each empty cell is filled,
+2. the color of each cell follows from the parity of that move number,
+3. for every 5-cell window, the move completing it is the largest move
+   number in it, and it counts for a color only when all 5 cells are that
+   color; the smaller of the two colors' earliest completions decides.
+
+With playout="pattern" the keys are weighted by Game.move_scores of the
+leaf, so threatening and defending cells tend to be filled first (weighted
+sampling without replacement); "random" fills uniformly.
+
+The tree is kept between moves: the next search starts from the node of the
+moves played since, when the previous tree reached them.
+
+Run ``python -m gomoku.mcts`` for playouts per second per batch size.
+"""
+import math
+import time
+
+import numpy as np
+
+from gomoku.constants import EMPTY, WHITE, BLACK
+from gomoku.evaluation import window_indices
+
+# playouts per search without a time limit or a playout budget
+PLAYOUTS = 20000
+BATCH = 128
+EXPLORATION = 1.4
+# move_scores worth doubling a cell's weight in pattern playouts
+PATTERN_SCALE = 100
+# a move number larger than any real one
+NEVER = 1 << 14
+
+
+class Node:
+    __slots__ = ("move", "color", "parent", "children", "untried", "visits", "wins")
+
+    def __init__(self, move, color, parent=None):
+        self.move = move
+        # the color that played move, wins are counted for it
+        self.color = color
+        self.parent = parent
+        self.children = []
+        # moves not expanded yet, best (by move ordering) last; None until
+        # the node is first reached
+        self.untried = None
+        self.visits = 0
+        self.wins = 0.0
+
+    def select(self, exploration):
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits +
+                   exploration * math.sqrt(log_visits / child.visits))
+
+
+class MCTS:
+    def __init__(self, size, batch=BATCH, exploration=EXPLORATION, playout="pattern", seed=None):
+        self.size = size
+        self.batch = batch
+        self.exploration = exploration
+        self.playout = playout
+        self.rng = np.random.default_rng(seed)
+        self.windows = window_indices(size, 5)
+        self.root = None
+        # the game's history at the root, [(i, j, color)]
+        self.root_history = []
+        # totals of the last search
+        self.playouts = 0
+        self.iterations = 0
+        self.seconds = 0.0
+        self.reused = 0
+
+    def reuse(self, game, color):
+        """Root for game's position with color to move: the old subtree or a new node."""
+        history = [(i, j, c) for i, j, c, _ in game.history]
+        node = self.root
+        if node is not None and history[:len(self.root_history)] == self.root_history:
+            for i, j, c in history[len(self.root_history):]:
+                node = next((child for child in node.children
+                             if child.move == (i, j) and child.color == c), None)
+                if node is None:
+                    break
+        opponent = BLACK if color == WHITE else WHITE
+        if node is None or node.color != opponent:
+            node = Node(None, opponent)
+        node.parent = None
+        self.root, self.root_history = node, history
+        return node
+
+    def search(self, game, color, time_limit=None, playouts=None):
+        """Best move for color by visit count; the game is left as it was.
+
+        Setting game.stop ends the search with the best move so far.
+        """
+        start = time.perf_counter()
+        if time_limit is None and playouts is None:
+            playouts = PLAYOUTS
+        deadline = None if time_limit is None else start + time_limit
+        root = self.reuse(game, color)
+        self.reused = root.visits
+        self.playouts = self.iterations = 0
+        while True:
+            if playouts is not None and self.playouts >= playouts:
+                break
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            if game.stop:
+                break
+            self.iterate(game, root)
+        self.seconds = time.perf_counter() - start
+        if not root.children:
+            return None
+        return max(root.children, key=lambda child: child.visits).move
+
+    def iterate(self, game, root):
+        node = root
+        plies = len(game.history)
+        # selection: down through fully expanded nodes
+        while True:
+            if node.untried is None:
+                opponent = BLACK if node.color == WHITE else WHITE
+                if game.winner != EMPTY or game.is_draw():
+                    node.untried = []
+                else:
+                    node.untried = game.order_moves(game.get_all_valid_moves(), opponent)[::-1]
+            if node.untried or not node.children:
+                break
+            node = node.select(self.exploration)
+            game.make_move(node.move[0], node.move[1], node.color)
+        # expansion
+        if node.untried:
+            i, j = node.untried.pop()
+            child = Node((i, j), BLACK if node.color == WHITE else WHITE, node)
+            node.children.append(child)
+            game.make_move(i, j, child.color)
+            node = child
+        # simulation
+        if game.winner != EMPTY:
+            white = self.batch if game.winner == WHITE else 0
+            black = self.batch - white
+        elif game.is_draw():
+            white = black = 0
+        else:
+            white, black = self.playouts_from(game, BLACK if node.color == WHITE else WHITE)
+        draws = self.batch - white - black
+        self.playouts += self.batch
+        self.iterations += 1
+        game.nodes += 1
+        # backpropagation
+        while node is not None:
+            node.visits += self.batch
+            node.wins += (white if node.color == WHITE else black) + 0.5 * draws
+            node = node.parent
+        while len(game.history) > plies:
+            game.undo_move()
+
+    def playouts_from(self, game, color):
+        """(white wins, black wins) of a batch of playouts with color to move."""
+        batch = self.batch
+        cells = np.ascontiguousarray(game.matrix).ravel()
+        empty = np.flatnonzero(cells == EMPTY)
+        keys = self.rng.random((batch, len(empty)))
+        if self.playout == "pattern":
+            weights = 1.0 + game.move_scores().ravel()[empty] / PATTERN_SCALE
+            # weighted sampling without replacement: the largest u ** (1 / weight) first
+            keys = np.log(keys)
+            keys /= -weights
+        order = np.argsort(keys, axis=1)
+        rank = np.empty((batch, len(empty)), dtype=np.int16)
+        np.put_along_axis(rank, order, np.arange(len(empty), dtype=np.int16)[None, :], axis=1)
+        # from here arrays are (cell, playout), so a window gathers whole rows;
+        # moves[cell, b] is the move number filling cell in playout b, -1 for stones
+        rank = rank.T
+        moves = np.full((cells.size, batch), -1, dtype=np.int16)
+        moves[empty] = rank
+        # codes add up to 5 in a white five and to 40 in a black one
+        base = ((cells == WHITE) + 8 * (cells == BLACK)).astype(np.int8)
+        codes = np.repeat(base[:, None], batch, axis=1)
+        own, other = (1, 8) if color == WHITE else (8, 1)
+        codes[empty] = ((rank & 1) * (other - own) + own).astype(np.int8)
+        # windows holding stones of both colors can never be completed
+        held = base[self.windows].sum(axis=1)
+        windows = self.windows[(held < 8) | (held % 8 == 0)].T
+        if not windows.shape[1]:
+            return 0, 0
+        sums = codes[windows[0]] + codes[windows[1]] + codes[windows[2]] + codes[windows[3]]
+        sums += codes[windows[4]]
+        done = np.maximum(np.maximum(moves[windows[0]], moves[windows[1]]),
+                          np.maximum(moves[windows[2]], moves[windows[3]]))
+        np.maximum(done, moves[windows[4]], out=done)
+        never = np.int16(NEVER)
+        white = np.where(sums == 5, done, never).min(axis=0)
+        black = np.where(sums == 40, done, never).min(axis=0)
+        return int((white < black).sum()), int((black < white).sum())
+
+
+def main(argv=None):
+    import argparse
+    from gomoku.benchmark import load_positions, setup
+
+    parser = argparse.ArgumentParser(description="MCTS playouts per second")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[15, 19])
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 16, 128, 512])
+    parser.add_argument("--playout", choices=["pattern", "random"], default="pattern")
+    parser.add_argument("--seconds", type=float, default=1.0, help="search time per run")
+    args = parser.parse_args(argv)
+
+    for position in load_positions(sizes=args.sizes):
+        for batch in args.batches:
+            game, color = setup(position)
+            mcts = MCTS(game.size, batch=batch, playout=args.playout, seed=0)
+            move = mcts.search(game, color, time_limit=args.seconds)
+            print(f"{position['name']:22} batch {batch:4} {mcts.playouts:>8,} playouts "
+                  f"{mcts.playouts / mcts.seconds:>10,.0f}/s {mcts.iterations:>6,} iterations "
+                  f"move {move}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Move ordering for the alpha-beta search: tactics, killers and history.
+
+Moves are tried in this order:
+
+1. the transposition-table move,
+2. tactical moves that make or stop a four or an open three,
+3. the killer moves of the ply (moves that caused a cutoff in a sibling),
+4. everything else, by history score (cutoffs weighted by depth squared)
+   with the tactical score breaking ties.
+
+The tactical score of a cell is the pattern score it adds for the side to
+move plus the score it would add for the opponent, read from the eleven cells
+around it on each of its four lines (an open pattern's six-cell window
+reaches five cells past the stone). With incremental evaluation those
+windows come straight from Game.lines; otherwise the ordering falls back to
+counting occupied neighbors; sparse boards read them from the board around
+the cell (SparseBoard.segment). At nodes with many candidates (a wide radius
+or an open board) the scores are read from one whole-board Game.move_scores grid
+instead, which costs the same as about BATCH_MOVES cell-by-cell lookups.
+"""
+from collections import defaultdict
+from functools import lru_cache
+
+from gomoku.constants import WHITE, BLACK
+from gomoku.evaluation import OPEN_THREE, score_line, bits_to_cells
+from gomoku.transposition import NO_MOVE
+
+# tactical score from which a move is searched before the killers
+TACTICAL = OPEN_THREE
+KILLERS = 2
+# candidate count from which tactical scores come from Game.move_scores
+BATCH_MOVES = 120
+# boards with more cells keep the history in dicts rather than lists
+HISTORY_LIST_CELLS = 1 << 16
+
+
+@lru_cache(maxsize=None)
+def window_gains(window, k):
+    """(white gain, black gain) of a stone on window[k], both >= 0 for a good move."""
+    base = score_line(window)
+    white = score_line(window[:k] + (WHITE,) + window[k + 1:]) - base
+    black = score_line(window[:k] + (BLACK,) + window[k + 1:]) - base
+    return white, -black
+
+
+def cell_gains(game, i, j):
+    """(white gain, black gain) of a stone on (i, j), read from the cells
+    around it; needs incremental evaluation (always on for sparse boards)."""
+    white = black = 0
+    if game.sparse:
+        for direction in range(4):
+            white_bits, black_bits, length, pos = game.board.segment(i, j, direction, 5)
+            w, b = window_gains(bits_to_cells(white_bits, black_bits, length), pos)
+            white += w
+            black += b
+        return white, black
+    for lid, pos in game.cell_lines[i * game.size + j]:
+        line = game.lines[lid]
+        lo = max(pos - 5, 0)
+        w, b = window_gains(tuple(line[lo:pos + 6]), pos - lo)
+        white += w
+        black += b
+    return white, black
+
+
+class MoveOrdering:
+    def __init__(self, size):
+        self.size = size
+        # history[color][cell]: depth**2 summed over the cutoffs cell caused
+        if size * size > HISTORY_LIST_CELLS:
+            self.history = [defaultdict(int) for _ in range(3)]
+        else:
+            self.history = [[0] * (size * size) for _ in range(3)]
+        # killers[ply]: the last KILLERS cells that cut off at that ply
+        self.killers = {}
+        # how many moves at the front of the last order() are there for a
+        # reason (the tt move, tactical moves and killers), the rest are quiet
+        self.leading = 0
+
+    def new_search(self):
+        # keep some memory of earlier moves but let the new search dominate
+        for table in self.history:
+            for cell in (list(table) if isinstance(table, dict) else range(len(table))):
+                table[cell] >>= 1
+        self.killers.clear()
+
+    def tactical(self, game, i, j):
+        if not game.incremental_eval:
+            return game.board.count_neighbors(i, j)
+        white, black = self.gains(game, i, j)
+        return white + black
+
+    def gains(self, game, i, j):
+        """(white gain, black gain) of a stone on (i, j); needs incremental evaluation."""
+        return cell_gains(game, i, j)
+
+    def tacticals(self, game, moves):
+        if game.incremental_eval and len(moves) >= BATCH_MOVES and not game.sparse:
+            grid = game.move_scores()
+            return [int(grid[i, j]) for i, j in moves]
+        return [self.tactical(game, i, j) for i, j in moves]
+
+    def order(self, game, moves, color, tt_move=NO_MOVE):
+        """Return moves for color to play, best candidates first."""
+        size = self.size
+        history = self.history[color]
+        killers = self.killers.get(len(game.history), ())
+        keyed = []
+        for (i, j), tactical in zip(moves, self.tacticals(game, moves)):
+            cell = i * size + j
+            if cell == tt_move:
+                key = (3, 0, 0)
+            elif tactical >= TACTICAL:
+                key = (2, tactical, 0)
+            elif cell in killers:
+                key = (1, -killers.index(cell), 0)
+            else:
+                key = (0, history[cell], tactical)
+            keyed.append((key, (i, j)))
+        keyed.sort(key=lambda item: item[0], reverse=True)
+        self.leading = sum(key[0] > 0 for key, _ in keyed)
+        return [move for _, move in keyed]
+
+    def cutoff(self, game, i, j, color, depth):
+        """Record that color playing (i, j) caused a cutoff at the current ply."""
+        cell = i * self.size + j
+        self.history[color][cell] += depth * depth
+        ply = len(game.history)
+        killers = self.killers.setdefault(ply, [])
+        if cell not in killers:
+            killers.insert(0, cell)
+            del killers[KILLERS:]
@@ -0,0 +1,180 @@
+"""Root-parallel search over a process pool.
+
+The root moves are spread over a ProcessPoolExecutor. The first (best
+ordered) root move is searched alone so its score bounds the others, then
+the rest run concurrently and publish every improvement through a shared
+alpha, so late root moves can still be cut off. Positions travel as
+Game.compact_state() (settings plus the packed move list), and each worker
+keeps its Game and transposition table between tasks.
+
+Children are searched with alpha one below the shared best score (scores are
+integers), so ties still get exact scores and the first best move in root
+order wins, exactly as in the serial search.
+
+Run ``python -m gomoku.parallel`` to time each worker count against the
+serial search and check that it picks the same move. The workers only pay
+off with a CPU core each; on a single core they share one and cost the pool
+overhead.
+"""
+import argparse
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from gomoku.constants import WHITE, BLACK
+from gomoku.evaluation import WIN_SCORE
+
+# one pool (and its shared alpha) per worker count, created on first use
+_pools = {}
+
+# per worker process
+_alpha = None
+_game = None
+_search_id = None
+
+
+def _init_worker(alpha):
+    global _alpha
+    _alpha = alpha
+
+
+def get_pool(workers):
+    if workers not in _pools:
+        alpha = multiprocessing.Value("d", -math.inf)
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(alpha,))
+        _pools[workers] = pool, alpha
+    return _pools[workers]
+
+
+def shutdown_pools():
+    for pool, _ in _pools.values():
+        pool.shutdown()
+    _pools.clear()
+
+
+def worker_game(state):
+    global _game
+    from gomoku.game import Game
+    if _game is None or _game.size != state[0] or _game.config != state[1]:
+        _game = Game.from_state(state)
+    else:
+        _game.load_state(state)
+    return _game
+
+
+def _search_move(state, move, ai_type, color, depth, time_left, search_id, extensions):
+    global _search_id
+    from gomoku.game import SearchTimeout
+    from gomoku.transposition import TranspositionTable
+    game = worker_game(state)
+    game.quiescence, game.lmr = extensions
+    if ai_type in ("alpha-beta", "pvs"):
+        if game.tt is None:
+            game.tt = TranspositionTable(game.tt_size_mb)
+        if search_id != _search_id:
+            game.tt.new_search()
+            _search_id = search_id
+    if time_left is not None:
+        game.deadline = time.perf_counter() + time_left
+    game.make_move(move[0], move[1], color)
+    game.nodes = 0
+    try:
+        if ai_type == "minimax":
+            score = game.minimax(depth, color == BLACK)
+            return (-score if color == BLACK else score), game.nodes
+        # pvs runs without the root aspiration window, the shared alpha bounds it
+        search = game.pvs if ai_type == "pvs" else game.alpha_beta_minimax
+        score = search(_alpha.value - 1, math.inf, depth, color, False)
+        with _alpha.get_lock():
+            if score > _alpha.value:
+                _alpha.value = score
+        return score, game.nodes
+    except SearchTimeout:
+        return None, game.nodes
+    finally:
+        game.deadline = None
+
+
+def parallel_search_root(game, moves, ai_type, color, depth, workers, time_left=None):
+    """Return (best_score, best_move) like Game.search_root, None on timeout."""
+    if not moves:
+        return -math.inf, None
+    pool, alpha = get_pool(workers)
+    alpha.value = -math.inf
+    state = game.compact_state()
+    search_id = time.perf_counter_ns()
+    args = (ai_type, color, depth, time_left, search_id, (game.quiescence, game.lmr))
+    results = [pool.submit(_search_move, state, moves[0], *args).result()]
+    futures = [pool.submit(_search_move, state, move, *args) for move in moves[1:]]
+    results += [future.result() for future in futures]
+    scores = [score for score, _ in results]
+    game.nodes += sum(nodes for _, nodes in results)
+    if None in scores:
+        return None
+    best = max(range(len(moves)), key=lambda k: (scores[k], -k))
+    return scores[best], moves[best]
+
+
+def parallel_ai_move(game, moves, ai_type, color, depth, time_limit, workers):
+    """Best root move, at fixed depth or deepening until time_limit runs out."""
+    if time_limit is None:
+        return parallel_search_root(game, moves, ai_type, color, depth, workers)[1]
+    deadline = time.perf_counter() + time_limit
+    best_move = moves[0] if moves else None
+    for d in range(game.empty_count):
+        time_left = deadline - time.perf_counter()
+        if time_left <= 0:
+            break
+        result = parallel_search_root(game, moves, ai_type, color, d, workers, time_left)
+        if result is None:
+            break
+        best_score, best_move = result
+        if abs(best_score) >= WIN_SCORE:
+            break
+        moves.remove(best_move)
+        moves.insert(0, best_move)
+    return best_move
+
+
+def benchmark(size=15, depth=2, worker_counts=(1, 2, 4, 8, 16), ai_type="alpha-beta"):
+    from gomoku.game import Game
+    opening = [(7, 7), (7, 8), (8, 7), (6, 6), (8, 8), (9, 9)]
+    center = size // 2 - 7
+    game = Game(size, backend="bitboard", incremental_eval=True)
+    color = WHITE
+    for i, j in opening:
+        game.make_move(i + center, j + center, color)
+        color = BLACK if color == WHITE else WHITE
+    moves = game.heuristic_sort_moves(game.get_all_valid_moves())
+
+    serial = Game.from_state(game.compact_state())
+    serial.tt = None
+    if ai_type in ("alpha-beta", "pvs"):
+        from gomoku.transposition import TranspositionTable
+        serial.tt = TranspositionTable(serial.tt_size_mb)
+    start = time.perf_counter()
+    serial_score, serial_move = serial.search_root(list(moves), ai_type, color, depth)
+    serial_time = time.perf_counter() - start
+    print(f"serial: {serial_time:.2f}s move {serial_move} score {serial_score}")
+
+    for workers in worker_counts:
+        get_pool(workers)[0].submit(int).result()  # start the processes outside the timing
+        start = time.perf_counter()
+        score, move = parallel_search_root(game, list(moves), ai_type, color, depth, workers)
+        elapsed = time.perf_counter() - start
+        same = "same move" if move == serial_move else "DIFFERENT MOVE"
+        print(f"{workers:2} workers: {elapsed:.2f}s speedup {serial_time / elapsed:.2f}x "
+              f"move {move} score {score} ({same})")
+    shutdown_pools()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Root-parallel search speedup")
+    parser.add_argument("--size", type=int, default=15)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--ai-type", default="alpha-beta", choices=["minimax", "alpha-beta", "pvs"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+    print(f"{multiprocessing.cpu_count()} CPUs")
+    benchmark(args.size, args.depth, tuple(args.workers), args.ai_type)
@@ -0,0 +1,106 @@
+"""Pondering: searching the opponent's likely replies while they think.
+
+After ai_move(..., ponder=True) plays a move, a Ponderer takes a copy of the
+game and, in a background thread, plays each of the opponent's most likely
+replies (the engine's own move ordering from the opponent's side) and runs
+the engine's ai_move for the answer. The copy shares the game's
+transposition table and history heuristic, so even an interrupted ponder
+warms the real search.
+
+When the next ai_move starts, the ponder thread is stopped first. If the
+opponent played a reply whose answer was searched to completion, that
+answer is played without searching again.
+
+Pondering stops on its own after max_seconds, and it runs on a single
+thread, so it never takes more than one core.
+"""
+import threading
+import time
+
+from gomoku.constants import WHITE, BLACK
+
+
+class PonderResult:
+    def __init__(self, move, complete, seconds, nodes):
+        self.move = move
+        # the answer's search ran to the end rather than being stopped
+        self.complete = complete
+        self.seconds = seconds
+        self.nodes = nodes
+
+
+class Ponderer:
+    def __init__(self, game, ai_type, color, depth=2, time_limit=None, replies=3,
+                 max_seconds=30.0, extensions=(0, 0)):
+        self.ai_type = ai_type
+        self.color = color
+        self.depth = depth
+        self.time_limit = time_limit
+        # ai_move's (quiescence, lmr)
+        self.extensions = extensions
+        self.base = list(game.history)
+        # search state shared with the game: only this thread touches it until
+        # stop() has joined, and afterwards only the game does
+        self.copy = game.search_copy()
+        opponent = BLACK if color == WHITE else WHITE
+        moves = self.copy.order_moves(self.copy.get_all_valid_moves(), opponent)
+        self.replies = moves[:replies]
+        self.results = {}
+        self.nodes = 0
+        self.thread = threading.Thread(target=self.run, args=(opponent,), daemon=True)
+        self.timer = threading.Timer(max_seconds, self.stop_search)
+        self.timer.daemon = True
+
+    def start(self):
+        self.thread.start()
+        self.timer.start()
+        return self
+
+    def run(self, opponent):
+        from gomoku.game import SearchTimeout
+        copy = self.copy
+        for reply in self.replies:
+            if copy.stop:
+                break
+            plies = len(copy.history)
+            copy.make_move(reply[0], reply[1], opponent)
+            start, start_nodes = time.perf_counter(), copy.nodes
+            move = None
+            try:
+                quiescence, lmr = self.extensions
+                move = copy.ai_move(self.ai_type, self.color, depth=self.depth,
+                                    time_limit=self.time_limit, quiescence=quiescence, lmr=lmr)
+                complete = not copy.stop
+            except SearchTimeout:
+                # a stopped fixed-depth search does not return a move
+                complete = False
+            while len(copy.history) > plies:
+                copy.undo_move()
+            self.results[reply] = PonderResult(move, complete and move is not None,
+                                               time.perf_counter() - start,
+                                               copy.nodes - start_nodes)
+        self.nodes = copy.nodes
+
+    def stop_search(self):
+        self.copy.stop = True
+
+    def stop(self):
+        """Stop pondering and wait for the thread to let go of the shared tables."""
+        self.timer.cancel()
+        self.stop_search()
+        self.thread.join()
+
+    def result_for(self, game, ai_type, color, depth, time_limit, extensions=(0, 0)):
+        """Stop, then return the pondered answer for game's position or None."""
+        self.stop()
+        game.keep_tree(self.copy)
+        if (ai_type, color, depth, time_limit, extensions) != (
+                self.ai_type, self.color, self.depth, self.time_limit, self.extensions):
+            return None
+        if len(game.history) != len(self.base) + 1 or game.history[:-1] != self.base:
+            return None
+        i, j, _, _ = game.history[-1]
+        result = self.results.get((i, j))
+        if result is None or not result.complete:
+            return None
+        return result.move
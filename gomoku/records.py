@@ -0,0 +1,277 @@
+"""Compact binary game records, streamed and replayed a game at a time.
+
+A record file is a plain concatenation of records, so finished games are
+appended as they come and files can be joined with ``cat``. Every record is
+(little endian)::
+
+    16-byte header  magic "GMKR", version u1, size u1, first color u1,
+                    result u1, plies u2, config length u2, 0 u4
+    config          engine configuration as UTF-8 JSON, config length bytes
+    moves           one byte per ply, i << 4 | j, on boards up to 16x16;
+                    two bytes per ply (i, j) on larger boards
+
+The colors alternate from the first color. result is WHITE or BLACK for a
+win, DRAW for a full board and EMPTY for a game that was stopped.
+
+Reading never loads a file whole: read_records yields one GameRecord at a
+time, and positions() replays a stream of records through a single Game per
+board size, taking the previous game back with undo_move instead of building
+a new board. The command line turns tournament output into records and
+summarizes record files::
+
+    python -m gomoku.records convert results.jsonl games.gmkr
+    python -m gomoku.records stats games.gmkr --max-ply 6 --top 10
+    python -m gomoku.records show games.gmkr --game 3
+
+gomoku.book reads record files too (any input ending in .gmkr).
+"""
+import json
+import os
+import struct
+
+from gomoku.constants import EMPTY, WHITE, BLACK
+
+MAGIC = b"GMKR"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBBHHI")
+DRAW = 3
+# records of games played through the CLI and the UI, when the player asks to
+# save them (the directory is ignored by git)
+GAMES = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "games")
+# the Game settings used for replaying: nothing is searched, so no
+# evaluation, candidate tracking or book
+REPLAY_OPTIONS = {"backend": "bitboard", "radius": 0, "book": False, "ordering": "neighbors"}
+
+
+def games_path(size):
+    """Default record file for games of a board size."""
+    return os.path.join(GAMES, f"{size}.gmkr")
+
+
+class GameRecord:
+    def __init__(self, size, moves, first=WHITE, result=EMPTY, config=None):
+        self.size = size
+        # [(i, j)] in the order played
+        self.moves = moves
+        self.first = first
+        self.result = result
+        self.config = config or {}
+
+    @classmethod
+    def from_game(cls, game, config=None):
+        """Record of game's moves so far; the result is EMPTY until it is over."""
+        if game.winner != EMPTY:
+            result = game.winner
+        elif game.is_draw():
+            result = DRAW
+        else:
+            result = EMPTY
+        first = game.history[0][2] if game.history else WHITE
+        return cls(game.size, [(i, j) for i, j, _, _ in game.history], first, result, config)
+
+    @classmethod
+    def from_result(cls, result):
+        """Record of a gomoku.tournament result line (WHITE moves first there)."""
+        a_color = WHITE if result["a_color"] == "white" else BLACK
+        b_color = BLACK if a_color == WHITE else WHITE
+        if result["winner"] is not None:
+            outcome = a_color if result["winner"] == "A" else b_color
+        elif result["plies"] == result["size"] ** 2:
+            outcome = DRAW
+        else:
+            outcome = EMPTY
+        engines = result["engines"]
+        config = {"white": engines["A" if a_color == WHITE else "B"],
+                  "black": engines["B" if a_color == WHITE else "A"],
+                  "opening_plies": result.get("opening_plies", 0)}
+        return cls(result["size"], [tuple(move) for move in result["moves"]], WHITE, outcome,
+                   config)
+
+    def color(self, ply):
+        if ply % 2 == 0:
+            return self.first
+        return BLACK if self.first == WHITE else WHITE
+
+    def plies(self):
+        """Yield (i, j, color) for every move."""
+        for ply, (i, j) in enumerate(self.moves):
+            yield i, j, self.color(ply)
+
+    def to_bytes(self):
+        config = json.dumps(self.config, separators=(",", ":")).encode()
+        header = HEADER.pack(MAGIC, VERSION, self.size, self.first, self.result,
+                             len(self.moves), len(config), 0)
+        if self.size <= 16:
+            moves = bytes(i << 4 | j for i, j in self.moves)
+        else:
+            moves = bytes(v for move in self.moves for v in move)
+        return header + config + moves
+
+
+def write_records(path, records):
+    """Append records to the file at path; return how many were written."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    count = 0
+    with open(path, "ab") as f:
+        for record in records:
+            f.write(record.to_bytes())
+            count += 1
+    return count
+
+
+def save_game(game, config=None, path=None):
+    """Append game to path (default games/<size>.gmkr) and return the path.
+
+    Boards larger than 255 (unbounded sparse ones) do not fit the format
+    and are not saved; None is returned for them.
+    """
+    if game.size > 255:
+        return None
+    path = path or games_path(game.size)
+    write_records(path, [GameRecord.from_game(game, config)])
+    return path
+
+
+def read_records(path):
+    """Yield the GameRecords of a file one at a time."""
+    with open(path, "rb", buffering=1 << 20) as f:
+        while True:
+            header = f.read(HEADER.size)
+            if not header:
+                return
+            if len(header) < HEADER.size:
+                raise ValueError(f"{path}: truncated record header")
+            magic, version, size, first, result, plies, config_length, _ = HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} game record file")
+            config = json.loads(f.read(config_length)) if config_length else {}
+            width = 1 if size <= 16 else 2
+            data = f.read(plies * width)
+            if len(data) < plies * width:
+                raise ValueError(f"{path}: truncated record")
+            if width == 1:
+                moves = [(b >> 4, b & 15) for b in data]
+            else:
+                moves = list(zip(data[::2], data[1::2]))
+            yield GameRecord(size, moves, first, result, config)
+
+
+def replay(record, game=None, game_options=None):
+    """Play record's moves onto game (a new one by default) and return it."""
+    from gomoku.game import Game
+    if game is None:
+        game = Game(record.size, **(game_options or REPLAY_OPTIONS))
+    for i, j, color in record.plies():
+        game.make_move(i, j, color)
+    return game
+
+
+def positions(records, max_ply=None, game_options=None):
+    """Yield (record, game, ply, (i, j), color) for every move of every record.
+
+    game is the position before the move. It is shared, one Game per board
+    size, and is only valid until the next item is requested.
+    """
+    from gomoku.game import Game
+    games = {}
+    for record in records:
+        game = games.get(record.size)
+        if game is None:
+            game = games[record.size] = Game(record.size, **(game_options or REPLAY_OPTIONS))
+        while game.history:
+            game.undo_move()
+        for ply, (i, j, color) in enumerate(record.plies()):
+            if max_ply is not None and ply > max_ply:
+                break
+            yield record, game, ply, (i, j), color
+            game.make_move(i, j, color)
+
+
+class PositionStats:
+    """Games, results and moves played per position, from positions()."""
+
+    def __init__(self):
+        # key -> [ply, moves to reach it, games, white wins, black wins, draws, {move: games}]
+        self.table = {}
+        self.games = 0
+        self.results = {WHITE: 0, BLACK: 0, DRAW: 0, EMPTY: 0}
+        self.plies = 0
+
+    def count(self, records):
+        for record in records:
+            self.games += 1
+            self.results[record.result] += 1
+            self.plies += len(record.moves)
+            yield record
+
+    def add_records(self, records, max_ply=8):
+        for record, game, ply, move, color in positions(self.count(records), max_ply):
+            key = game.hash ^ game.zobrist_extra[color]
+            entry = self.table.get(key)
+            if entry is None:
+                entry = self.table[key] = [ply, record.moves[:ply], 0, 0, 0, 0, {}]
+            entry[2] += 1
+            if record.result in (WHITE, BLACK, DRAW):
+                entry[2 + record.result] += 1
+            entry[6][move] = entry[6].get(move, 0) + 1
+        return self
+
+    def most_common(self, n=10):
+        """The n positions reached in the most games, as table entries."""
+        return sorted(self.table.values(), key=lambda entry: (-entry[2], entry[0]))[:n]
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gomoku game records")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert = commands.add_parser("convert", help="tournament JSON lines to records")
+    convert.add_argument("inputs", nargs="+")
+    convert.add_argument("out")
+    stats = commands.add_parser("stats", help="results and the most common positions")
+    stats.add_argument("inputs", nargs="+")
+    stats.add_argument("--max-ply", type=int, default=8)
+    stats.add_argument("--top", type=int, default=10)
+    show = commands.add_parser("show", help="print the final board of a game")
+    show.add_argument("input")
+    show.add_argument("--game", type=int, default=0, help="index of the game in the file")
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        def converted():
+            for path in args.inputs:
+                with open(path) as f:
+                    for line in f:
+                        if line.strip():
+                            yield GameRecord.from_result(json.loads(line))
+        print(f"{args.out}: {write_records(args.out, converted())} games appended")
+    elif args.command == "stats":
+        table = PositionStats()
+        for path in args.inputs:
+            table.add_records(read_records(path), args.max_ply)
+        results = table.results
+        print(f"games {table.games}: white wins {results[WHITE]}, black wins {results[BLACK]}, "
+              f"draws {results[DRAW]}, unfinished {results[EMPTY]}; "
+              f"{table.plies / max(table.games, 1):.1f} plies per game")
+        print(f"{len(table.table)} positions up to ply {args.max_ply}")
+        for ply, moves, games, white, black, draws, replies in table.most_common(args.top):
+            best = max(replies.items(), key=lambda item: item[1])
+            print(f"ply {ply:2} {games:>7} games  white {white / games:4.0%} black "
+                  f"{black / games:4.0%} draw {draws / games:4.0%}  most played {best[0]} "
+                  f"({best[1]})  after {moves}")
+    else:
+        for index, record in enumerate(read_records(args.input)):
+            if index == args.game:
+                game = replay(record)
+                game.print_board()
+                result = {WHITE: "white wins", BLACK: "black wins", DRAW: "draw",
+                          EMPTY: "unfinished"}[record.result]
+                print(f"{len(record.moves)} plies, {result}, config {record.config}")
+                break
+        else:
+            parser.error(f"{args.input} has fewer than {args.game + 1} games")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+"""Line-based engine protocol in the style of the Gomocup protocol.
+
+One session is one game. The commands are::
+
+    START size           new game on a size x size board       -> OK
+    RESTART              new game on the same board             -> OK
+    BEGIN                the engine moves first                 -> x,y
+    TURN x,y             the opponent played x,y                -> x,y
+    BOARD                followed by lines x,y,field (1 for the engine's
+                         stones, 2 for the opponent's) and DONE  -> x,y
+    TAKEBACK x,y         undo the last move, x,y                -> OK
+    INFO key value       timeout_turn, timeout_match, time_left (ms),
+                         max_memory (bytes); other keys are ignored
+    ABOUT                                                       -> name="...", ...
+    END                  close the session
+
+x is the column and y the row. Problems are answered with ``ERROR text``
+and unknown commands with ``UNKNOWN text``.
+
+Serve one session on stdin/stdout, or any number of them on a local socket,
+one per connection::
+
+    python -m gomoku.server
+    python -m gomoku.server --listen 127.0.0.1:7777 --workers 4
+    python -m gomoku.server --listen unix:/tmp/gomoku.sock
+
+On a socket the searches of all sessions share a pool of worker processes;
+positions travel as Game.compact_state() and every worker keeps its Game and
+transposition table between moves, as in gomoku.parallel. A move is due
+within the session's time budget (timeout_turn, and a share of time_left);
+when the pool cannot answer in time, the best move by move ordering is
+played instead. Each session's latencies are logged when it ends.
+
+The local client plays engine-against-engine games through a running server
+and reports the latencies it saw::
+
+    python -m gomoku.server --connect 127.0.0.1:7777 --games 8 --size 15
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from gomoku.constants import EMPTY, WHITE, BLACK
+from gomoku.parallel import worker_game
+
+ABOUT = 'name="AI-Gomaku", version="1.0", country="", www=""'
+ENGINE = {"ai_type": "pvs"}
+GAME_OPTIONS = {"backend": "bitboard", "incremental_eval": True}
+# per-move budget without INFO timeout_turn, and the smallest one (ms)
+TIMEOUT_TURN = 5000
+MIN_TURN = 50
+# kept back from every budget for the reply to reach the client (ms)
+MARGIN = 100
+# of the time left in the match, at most this share goes to one move
+TIME_LEFT_SHARE = 1 / 8
+
+
+def search(state, engine, deadline):
+    """Worker task: (move, nodes, seconds) for WHITE by the time.time() deadline.
+
+    The worker's Game is the one gomoku.parallel keeps per process.
+    """
+    start = time.perf_counter()
+    game = worker_game(state)
+    game.nodes = 0
+    time_limit = deadline - time.time()
+    if time_limit * 1000 < MIN_TURN:
+        # the task waited in the queue for most of its budget
+        move = game.order_moves(game.get_all_valid_moves(), WHITE)[0]
+    else:
+        options = {key: value for key, value in engine.items() if key != "ai_type"}
+        move = game.ai_move(engine["ai_type"], WHITE, time_limit=time_limit, **options)
+    return move, game.nodes, time.perf_counter() - start
+
+
+def _warm_up():
+    import gomoku.game  # noqa: F401
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+class Session:
+    """The state of one protocol session; the engine always plays WHITE."""
+
+    def __init__(self, engine=None, game_options=None, records=None):
+        self.engine = dict(engine or ENGINE)
+        self.game_options = dict(game_options or GAME_OPTIONS)
+        # append every game to this record file (gomoku.records)
+        self.records = records
+        self.game = None
+        self.info = {}
+        # lines of a BOARD command until DONE, otherwise None
+        self.board_lines = None
+        self.ended = False
+        # latency from receiving a move command to sending the move (s)
+        self.latencies = []
+        self.waits = []
+        self.nodes = 0
+        self.fallbacks = 0
+        self.started = time.perf_counter()
+
+    def new_game(self, size, save=True):
+        from gomoku.game import Game
+        if save:
+            self.save()
+        self.game = Game(size, **self.game_options)
+
+    def save(self):
+        if self.records and self.game is not None and self.game.history:
+            from gomoku.records import save_game
+            save_game(self.game, {"white": self.engine, "black": "opponent"}, self.records)
+
+    def time_limit(self):
+        """Seconds the engine may think about its next move."""
+        budget = self.info.get("timeout_turn") or TIMEOUT_TURN
+        if self.info.get("time_left"):
+            budget = min(budget, self.info["time_left"] * TIME_LEFT_SHARE)
+        return max(budget - MARGIN, MIN_TURN) / 1000
+
+    def parse_move(self, text):
+        try:
+            x, y = (int(v) for v in text.split(",")[:2])
+        except ValueError:
+            return None
+        if not (0 <= x < self.game.size and 0 <= y < self.game.size):
+            return None
+        return y, x
+
+    def handle(self, line):
+        """Apply one protocol line; return (reply lines, whether a move is due)."""
+        line = line.strip()
+        if not line:
+            return [], False
+        if self.board_lines is not None:
+            if line.upper() != "DONE":
+                self.board_lines.append(line)
+                return [], False
+            return self.set_board()
+        command, _, args = line.partition(" ")
+        command = command.upper()
+        if command == "INFO":
+            key, _, value = args.strip().partition(" ")
+            try:
+                self.info[key.lower()] = int(value)
+            except ValueError:
+                self.info[key.lower()] = value
+            if key.lower() == "max_memory" and self.info[key.lower()]:
+                # half of the allowance for the transposition table, from the next game
+                self.game_options["tt_size_mb"] = max(1, min(256, int(value) >> 21))
+            return [], False
+        if command == "ABOUT":
+            return [ABOUT], False
+        if command == "END":
+            self.save()
+            self.ended = True
+            return [], False
+        if command == "START":
+            try:
+                size = int(args)
+            except ValueError:
+                return ["ERROR START needs a board size"], False
+            if not 5 <= size <= 32:
+                return [f"ERROR unsupported size {size}"], False
+            self.new_game(size)
+            return ["OK"], False
+        if command == "RECTSTART":
+            return ["ERROR only square boards are supported"], False
+        if self.game is None:
+            return [f"ERROR {command} before START"], False
+        if command == "RESTART":
+            self.new_game(self.game.size)
+            return ["OK"], False
+        if command == "BEGIN":
+            return [], True
+        if command == "TURN":
+            move = self.parse_move(args)
+            if move is None or self.game.board.get(*move) != EMPTY:
+                return [f"ERROR invalid move {args.strip()}"], False
+            self.game.make_move(move[0], move[1], BLACK)
+            return [], self.game.winner == EMPTY and not self.game.is_draw()
+        if command == "BOARD":
+            self.board_lines = []
+            return [], False
+        if command == "TAKEBACK":
+            move = self.parse_move(args)
+            if move is None or not self.game.history or self.game.history[-1][:2] != move:
+                return [f"ERROR cannot take back {args.strip()}"], False
+            self.game.undo_move()
+            return ["OK"], False
+        return [f"UNKNOWN {command}"], False
+
+    def set_board(self):
+        stones, self.board_lines = self.board_lines, None
+        # some managers send the whole board before every move: not a new game
+        self.new_game(self.game.size, save=False)
+        for text in stones:
+            move = self.parse_move(text)
+            if move is None or self.game.board.get(*move) != EMPTY:
+                return [f"ERROR invalid BOARD line {text}"], False
+            field = text.split(",")[2] if text.count(",") >= 2 else "2"
+            self.game.make_move(move[0], move[1], WHITE if field.strip() == "1" else BLACK)
+        return [], self.game.winner == EMPTY and not self.game.is_draw()
+
+    def fallback_move(self):
+        return self.game.order_moves(self.game.get_all_valid_moves(), WHITE)[0]
+
+    def reply(self, move, received):
+        """The reply line for the engine's move, which is on the board already."""
+        i, j = move
+        self.latencies.append(time.perf_counter() - received)
+        return f"{j},{i}"
+
+    def play(self, move, received):
+        self.game.make_move(move[0], move[1], WHITE)
+        return self.reply(move, received)
+
+    def think(self, received):
+        """Search on this session's own Game (stdin mode) and return the reply line."""
+        game = self.game
+        start_nodes = game.nodes
+        options = {key: value for key, value in self.engine.items() if key != "ai_type"}
+        move = game.ai_move(self.engine["ai_type"], WHITE, time_limit=self.time_limit(),
+                            **options)
+        self.nodes += game.nodes - start_nodes
+        self.waits.append(0.0)
+        if move is None:
+            return self.play(self.fallback_move(), received)
+        return self.reply(move, received)
+
+    async def think_in_pool(self, pool, received):
+        """Search in the worker pool, playing the fallback move when it is late."""
+        budget = self.time_limit()
+        # wall-clock deadline, shared with the worker processes
+        deadline = time.time() + budget
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(pool, search, self.game.compact_state(), self.engine,
+                                      deadline)
+        try:
+            move, nodes, seconds = await asyncio.wait_for(asyncio.shield(future),
+                                                          budget + MARGIN / 2000)
+        except asyncio.TimeoutError:
+            self.fallbacks += 1
+            self.waits.append(budget)
+            return self.play(self.fallback_move(), received)
+        self.nodes += nodes
+        self.waits.append(max(time.perf_counter() - received - seconds, 0.0))
+        if move is None:
+            move = self.fallback_move()
+        return self.play(move, received)
+
+    def metrics(self):
+        latencies = self.latencies
+
+        def ms(seconds):
+            return None if seconds is None else round(1000 * seconds, 1)
+
+        return {
+            "moves": len(latencies),
+            "seconds": round(time.perf_counter() - self.started, 3),
+            "latency_mean_ms": ms(sum(latencies) / len(latencies) if latencies else None),
+            "latency_p95_ms": ms(percentile(latencies, 0.95)),
+            "latency_max_ms": ms(max(latencies, default=None)),
+            "queue_wait_mean_ms": ms(sum(self.waits) / len(self.waits) if self.waits else None),
+            "nodes": self.nodes,
+            "fallbacks": self.fallbacks,
+        }
+
+
+def serve_stdio(engine=None, records=None, stdin=sys.stdin, stdout=sys.stdout):
+    """One session on stdin/stdout, searching in this process."""
+    session = Session(engine, records=records)
+    for line in stdin:
+        received = time.perf_counter()
+        replies, move_due = session.handle(line)
+        if move_due:
+            replies.append(session.think(received))
+        for reply in replies:
+            stdout.write(reply + "\n")
+        stdout.flush()
+        if session.ended:
+            break
+    return session
+
+
+class Server:
+    def __init__(self, workers=None, engine=None, records=None, metrics_path=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(self.workers)
+        self.engine = engine
+        self.records = records
+        # append each finished session's metrics here as a JSON line
+        self.metrics_path = metrics_path
+        self.sessions = 0
+
+    async def warm_up(self):
+        # start the workers and import the engine before the first move is due
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _warm_up)
+                               for _ in range(self.workers)))
+
+    async def handle_connection(self, reader, writer):
+        self.sessions += 1
+        number = self.sessions
+        session = Session(self.engine, records=self.records)
+        try:
+            while not session.ended:
+                line = await reader.readline()
+                if not line:
+                    break
+                received = time.perf_counter()
+                replies, move_due = session.handle(line.decode())
+                if move_due:
+                    replies.append(await session.think_in_pool(self.pool, received))
+                if replies:
+                    writer.write("".join(reply + "\n" for reply in replies).encode())
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if not session.ended:
+                session.save()
+            writer.close()
+        self.report(number, session.metrics())
+
+    def report(self, number, metrics):
+        print(f"session {number}: " + ", ".join(f"{key} {value}" for key, value in metrics.items()),
+              file=sys.stderr)
+        if self.metrics_path:
+            with open(self.metrics_path, "a") as f:
+                f.write(json.dumps(dict(metrics, session=number)) + "\n")
+
+    async def serve(self, address):
+        await self.warm_up()
+        if address.startswith("unix:"):
+            server = await asyncio.start_unix_server(self.handle_connection, address[5:])
+        else:
+            host, port = address.rsplit(":", 1)
+            server = await asyncio.start_server(self.handle_connection, host, int(port))
+        print(f"listening on {address} with {self.workers} search workers", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+
+async def open_connection(address):
+    if address.startswith("unix:"):
+        return await asyncio.open_unix_connection(address[5:])
+    host, port = address.rsplit(":", 1)
+    return await asyncio.open_connection(host, int(port))
+
+
+async def play_client_game(address, size, timeout_turn):
+    """Play the server against itself over two sessions; return (winner, latencies)."""
+    from gomoku.game import Game
+    players = [await open_connection(address) for _ in range(2)]
+    latencies = []
+
+    async def ask(player, lines):
+        reader, writer = players[player]
+        writer.write("".join(line + "\n" for line in lines).encode())
+        await writer.drain()
+        start = time.perf_counter()
+        reply = (await reader.readline()).decode().strip()
+        return reply, time.perf_counter() - start
+
+    for reader, writer in players:
+        writer.write(f"INFO timeout_turn {timeout_turn}\n".encode())
+    for player in range(2):
+        reply, _ = await ask(player, [f"START {size}"])
+        if reply != "OK":
+            raise RuntimeError(f"START answered {reply!r}")
+    # the referee's board: player 0 plays WHITE
+    game = Game(size, backend="bitboard", book=False, ordering="neighbors")
+    player, command = 0, "BEGIN"
+    while game.winner == EMPTY and not game.is_draw():
+        reply, seconds = await ask(player, [command])
+        latencies.append(seconds)
+        x, y = (int(v) for v in reply.split(","))
+        if game.board.get(y, x) != EMPTY:
+            raise RuntimeError(f"player {player} played the occupied cell {reply}")
+        game.make_move(y, x, WHITE if player == 0 else BLACK)
+        player, command = 1 - player, f"TURN {reply}"
+    for reader, writer in players:
+        writer.write(b"END\n")
+        await writer.drain()
+        writer.close()
+    winner = {WHITE: "first", BLACK: "second"}.get(game.winner)
+    return winner, len(game.history), latencies
+
+
+async def run_client(address, games, size, timeout_turn):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(play_client_game(address, size, timeout_turn)
+                                     for _ in range(games)))
+    latencies = [seconds for _, _, game_latencies in results for seconds in game_latencies]
+    seconds = time.perf_counter() - start
+    wins = sum(winner == "first" for winner, _, _ in results)
+    losses = sum(winner == "second" for winner, _, _ in results)
+    print(f"{games} games in {seconds:.1f} s: first player {wins} wins, second {losses}, "
+          f"{games - wins - losses} draws; {len(latencies)} moves")
+    over = sum(latency * 1000 > timeout_turn for latency in latencies)
+    print(f"move latency mean {1000 * sum(latencies) / len(latencies):.0f} ms, "
+          f"p95 {1000 * percentile(latencies, 0.95):.0f} ms, "
+          f"max {1000 * max(latencies):.0f} ms; {over} over the {timeout_turn} ms limit")
+    return over
+
+
+def main(argv=None):
+    from gomoku.tournament import parse_engine
+
+    parser = argparse.ArgumentParser(description="Gomoku engine protocol server")
+    parser.add_argument("--listen", help="HOST:PORT or unix:PATH (default: stdin/stdout)")
+    parser.add_argument("--connect", help="run the local client against a server at HOST:PORT "
+                                          "or unix:PATH")
+    parser.add_argument("--engine", default="pvs", help="ai_type[,key=value...], as in tournaments")
+    parser.add_argument("--workers", type=int, default=None, help="search processes")
+    parser.add_argument("--records", help="append every game to this .gmkr record file")
+    parser.add_argument("--metrics", help="append per-session metrics as JSON lines")
+    parser.add_argument("--games", type=int, default=4, help="client: concurrent games")
+    parser.add_argument("--size", type=int, default=15, help="client: board size")
+    parser.add_argument("--timeout-turn", type=int, default=1000, help="client: ms per move")
+    args = parser.parse_args(argv)
+
+    if args.connect:
+        return 1 if asyncio.run(run_client(args.connect, args.games, args.size,
+                                           args.timeout_turn)) else 0
+    engine = parse_engine(args.engine)
+    if not args.listen:
+        serve_stdio(engine, args.records)
+        return 0
+    server = Server(args.workers, engine, args.records, args.metrics)
+    try:
+        asyncio.run(server.serve(args.listen))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.pool.shutdown(cancel_futures=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Per-move search statistics.
+
+A SearchStats object is attached to Game.stats only while an instrumented
+ai_move runs; the search code checks ``self.stats is not None`` before
+touching it, so a plain ai_move pays a single attribute test per counter.
+The node count itself comes from Game.nodes, which is always kept.
+"""
+import json
+
+
+class SearchStats:
+    def __init__(self, ai_type, color, ply):
+        self.ai_type = ai_type
+        self.color = color
+        self.ply = ply
+        self.nodes = 0
+        self.leaves = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        # pvs: null-window searches that had to be repeated with the full
+        # window, and aspiration windows at the root that failed
+        self.researches = 0
+        self.aspiration_fails = 0
+        # quiescence nodes past the horizon, and late moves searched at
+        # reduced depth and how many of them were searched again in full
+        self.quiescence_nodes = 0
+        self.reductions = 0
+        self.reduction_researches = 0
+        # threat-space solver nodes and outcome ("win", "block", "vcf", ...)
+        self.threat_nodes = 0
+        self.threat_result = None
+        # the move came from the opening book, or from pondering (gomoku.ponder)
+        self.book = False
+        self.ponder_hit = False
+        # Monte Carlo playouts (gomoku.mcts)
+        self.playouts = 0
+        # completed iterations: (depth, seconds, nodes)
+        self.depths = []
+        self.seconds = 0.0
+        self.move = None
+        self.score = None
+
+    def cutoff(self, move_index):
+        self.cutoffs += 1
+        if move_index == 0:
+            self.first_move_cutoffs += 1
+
+    def finish_depth(self, depth, seconds, nodes):
+        self.depths.append((depth, seconds, nodes))
+
+    @property
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else None
+
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else None
+
+    @property
+    def effective_branching_factor(self):
+        """Node growth between the last two iterations, or nodes ** (1 / plies)."""
+        if len(self.depths) >= 2 and self.depths[-2][2]:
+            return self.depths[-1][2] / self.depths[-2][2]
+        if self.depths and self.nodes:
+            plies = self.depths[-1][0] + 1  # the root move plus the depth below it
+            return self.nodes ** (1 / plies)
+        return None
+
+    def to_dict(self):
+        return {
+            "ply": self.ply,
+            "ai_type": self.ai_type,
+            "color": self.color,
+            "move": list(self.move) if self.move else None,
+            "score": self.score,
+            "seconds": round(self.seconds, 6),
+            "nodes": self.nodes,
+            "nps": round(self.nodes / self.seconds) if self.seconds else None,
+            "leaves": self.leaves,
+            "cutoffs": self.cutoffs,
+            "first_move_cutoff_rate": self.first_move_cutoff_rate,
+            "effective_branching_factor": self.effective_branching_factor,
+            "tt_hit_rate": self.tt_hit_rate,
+            "researches": self.researches,
+            "aspiration_fails": self.aspiration_fails,
+            "quiescence_nodes": self.quiescence_nodes,
+            "reductions": self.reductions,
+            "reduction_researches": self.reduction_researches,
+            "threat_nodes": self.threat_nodes,
+            "threat_result": self.threat_result,
+            "book": self.book,
+            "ponder_hit": self.ponder_hit,
+            "playouts": self.playouts,
+            "playouts_per_second": round(self.playouts / self.seconds) if self.seconds else None,
+            "depths": [{"depth": d, "seconds": round(s, 6), "nodes": n} for d, s, n in self.depths],
+        }
+
+    def write_trace(self, path):
+        """Append this move's statistics as one JSON line."""
+        with open(path, "a") as f:
+            f.write(json.dumps(self.to_dict()) + "\n")
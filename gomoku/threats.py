@@ -0,0 +1,257 @@
+"""Threat-space search run in front of the main search.
+
+Only threat moves are considered: fours (one move from five) for victory by
+continuous fours (VCF) and, optionally, open threes (victory by continuous
+threats, VCT). The defender's replies are restricted to the forced blocks,
+so forced wins far beyond the main search depth are found with a few
+thousand nodes. The solver has its own node and time budget and simply
+gives up (returns None) when either runs out.
+"""
+import time
+from contextlib import contextmanager
+
+from gomoku.constants import EMPTY, WHITE, BLACK, DIRECTIONS
+
+
+class ThreatBudgetExceeded(Exception):
+    pass
+
+
+def line_cells(board, size, i, j):
+    """Empty cells within four steps of (i, j) along its four lines."""
+    get = board.get
+    cells = []
+    for di, dj in DIRECTIONS:
+        for k in (-4, -3, -2, -1, 1, 2, 3, 4):
+            x, y = i + di * k, j + dj * k
+            if 0 <= x < size and 0 <= y < size and get(x, y) == EMPTY:
+                cells.append((x, y))
+    return cells
+
+
+def five_cells(board, size, i, j, color):
+    """Empty cells completing a five of color through the stone on (i, j),
+    sorted; also used by the quiescence search (Game.quiesce)."""
+    get = board.get
+    cells = set()
+    for di, dj in DIRECTIONS:
+        line = [get(i + di * k, j + dj * k)
+                if 0 <= i + di * k < size and 0 <= j + dj * k < size else None
+                for k in range(-4, 5)]
+        if line.count(color) < 4:
+            continue
+        for start in range(5):
+            window = line[start:start + 5]
+            if window.count(color) == 4 and EMPTY in window:
+                k = start + window.index(EMPTY) - 4
+                cells.add((i + di * k, j + dj * k))
+    return sorted(cells)
+
+
+class ThreatSolver:
+    def __init__(self, game, max_nodes=20000, time_limit=None, threes=False, max_depth=12):
+        self.game = game
+        self.board = game.board
+        self.size = game.size
+        self.max_nodes = max_nodes
+        self.deadline = None if time_limit is None else time.perf_counter() + time_limit
+        self.threes = threes
+        self.max_depth = max_depth
+        self.nodes = 0
+        # how solve() decided: "win", "block", "vcf", "vct" or None
+        self.result = None
+
+    def _tick(self):
+        self.nodes += 1
+        if self.nodes > self.max_nodes or (
+                self.deadline is not None and time.perf_counter() > self.deadline):
+            raise ThreatBudgetExceeded
+
+    def _inside(self, i, j):
+        return 0 <= i < self.size and 0 <= j < self.size
+
+    def makes_five(self, i, j, color):
+        """Would a stone of color on the empty cell (i, j) make five?"""
+        get = self.board.get
+        for di, dj in DIRECTIONS:
+            count = 1
+            x, y = i + di, j + dj
+            while self._inside(x, y) and get(x, y) == color:
+                count += 1
+                x, y = x + di, y + dj
+            x, y = i - di, j - dj
+            while self._inside(x, y) and get(x, y) == color:
+                count += 1
+                x, y = x - di, y - dj
+            if count >= 5:
+                return True
+        return False
+
+    def line_cells(self, i, j):
+        return line_cells(self.board, self.size, i, j)
+
+    @contextmanager
+    def trial(self, i, j, color):
+        """A stone of color on (i, j) for the with block, on the board only
+        (not in the game's history or hash); it is taken off however the
+        block ends, including by ThreatBudgetExceeded."""
+        self.board.place(i, j, color)
+        try:
+            yield
+        finally:
+            self.board.remove(i, j)
+
+    def five_cells(self, i, j, color):
+        self._tick()
+        return five_cells(self.board, self.size, i, j, color)
+
+    def win_cells(self, color):
+        return [(i, j) for i, j in self.game.get_all_valid_moves() if self.makes_five(i, j, color)]
+
+    def line_count(self, i, j, color):
+        """Most stones of color on one line within four steps of (i, j)."""
+        get = self.board.get
+        best = 0
+        for di, dj in DIRECTIONS:
+            count = 0
+            for k in (-4, -3, -2, -1, 1, 2, 3, 4):
+                x, y = i + di * k, j + dj * k
+                if self._inside(x, y) and get(x, y) == color:
+                    count += 1
+            best = max(best, count)
+        return best
+
+    def four_moves(self, color):
+        """Moves making a four (or five) for color."""
+        moves = []
+        for i, j in self.game.get_all_valid_moves():
+            if self.line_count(i, j, color) < 3:
+                continue
+            with self.trial(i, j, color):
+                if self.five_cells(i, j, color):
+                    moves.append((i, j))
+        return moves
+
+    def open_four_cells(self, i, j, color):
+        """Cells near (i, j) where color would get two ways to make five."""
+        cells = []
+        for x, y in self.line_cells(i, j):
+            with self.trial(x, y, color):
+                if len(self.five_cells(x, y, color)) >= 2:
+                    cells.append((x, y))
+        return cells
+
+    def solve(self, color):
+        """Return a forced move for color (a win, a block or a threat sequence), or None."""
+        opponent = BLACK if color == WHITE else WHITE
+        try:
+            wins = self.win_cells(color)
+            if wins:
+                self.result = "win"
+                return wins[0]
+            blocks = self.win_cells(opponent)
+            if blocks:
+                self.result = "block"
+                return blocks[0]
+            move = self._vcf(color, self.max_depth)
+            if move is not None:
+                self.result = "vcf"
+                return move
+            if self.threes:
+                # deepen so short threat sequences are not starved of budget
+                # by long hopeless ones
+                for depth in range(1, self.max_depth + 1):
+                    move = self._vct(color, depth)
+                    if move is not None:
+                        self.result = "vct"
+                        return move
+        except ThreatBudgetExceeded:
+            pass
+        return None
+
+    def _vcf(self, color, depth):
+        for i, j in self.four_moves(color):
+            self._tick()
+            self.game.make_move(i, j, color)
+            try:
+                if self._four_wins(i, j, color, depth):
+                    return i, j
+            finally:
+                self.game.undo_move()
+        return None
+
+    def _four_wins(self, i, j, color, depth):
+        """color just played a four on (i, j); does it win by force?"""
+        game = self.game
+        if game.winner == color:
+            return True
+        threats = self.five_cells(i, j, color)
+        if len(threats) >= 2:
+            return True  # the opponent has no four (checked in solve), so one block is not enough
+        if depth <= 1:
+            return False
+        opponent = BLACK if color == WHITE else WHITE
+        bx, by = threats.pop()
+        game.make_move(bx, by, opponent)
+        try:
+            counter = self.five_cells(bx, by, opponent)
+            if not counter:
+                return self._vcf(color, depth - 1) is not None
+            if len(counter) > 1:
+                return False
+            # the block made a four, the attacker must block it with a four of its own
+            cx, cy = counter.pop()
+            with self.trial(cx, cy, color):
+                is_four = bool(self.five_cells(cx, cy, color))
+            if not is_four:
+                return False
+            self._tick()
+            game.make_move(cx, cy, color)
+            try:
+                return self._four_wins(cx, cy, color, depth - 1)
+            finally:
+                game.undo_move()
+        finally:
+            game.undo_move()
+
+    def _vct(self, color, depth):
+        if depth <= 0:
+            return None
+        move = self._vcf(color, depth)
+        if move is not None:
+            return move
+        opponent = BLACK if color == WHITE else WHITE
+        # the defender could answer a three with fours of its own; rather
+        # than search those, only attack when the defender has none
+        if self.four_moves(opponent):
+            return None
+        for i, j in self.game.get_all_valid_moves():
+            if self.line_count(i, j, color) < 2:
+                continue
+            self._tick()
+            self.game.make_move(i, j, color)
+            try:
+                if self.open_four_cells(i, j, color) and self._three_wins(i, j, color, depth):
+                    return i, j
+            finally:
+                self.game.undo_move()
+        return None
+
+    def _three_wins(self, i, j, color, depth):
+        """color just made an open three on (i, j); do all defenses lose?"""
+        opponent = BLACK if color == WHITE else WHITE
+        game = self.game
+        defenses = []
+        for x, y in self.line_cells(i, j):
+            with self.trial(x, y, opponent):
+                if not self.open_four_cells(i, j, color):
+                    defenses.append((x, y))
+        for x, y in defenses:
+            self._tick()
+            game.make_move(x, y, opponent)
+            try:
+                if self._vct(color, depth - 1) is None:
+                    return False
+            finally:
+                game.undo_move()
+        return True
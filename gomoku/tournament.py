@@ -0,0 +1,187 @@
+"""Headless self-play tournaments between two engine configurations.
+
+Example::
+
+    python -m gomoku.tournament --games 200 --size 15 --workers 8 \\
+        --engine-a alpha-beta,depth=2 --engine-b alpha-beta,time_limit=0.5 \\
+        --out results.jsonl
+
+An engine is ``ai_type[,key=value...]``; the keys are ai_move keyword
+arguments, e.g. ``pvs,depth=2,quiescence=4,lmr=3`` for the search
+extensions. Openings are random stones near the center, and every opening
+is played twice with the colors swapped. The summary reports nodes per move
+next to the results, so engines can be compared for strength per node. One
+JSON line per game is written as soon as the game finishes, and with
+--records the game is also appended to a binary record file
+(gomoku.records).
+"""
+import argparse
+import json
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from gomoku.constants import EMPTY, WHITE, BLACK
+from gomoku.records import GameRecord, write_records
+
+
+def parse_engine(spec):
+    """'alpha-beta,depth=3' -> {'ai_type': 'alpha-beta', 'depth': 3}"""
+    name, *options = spec.split(",")
+    engine = {"ai_type": name}
+    for option in options:
+        key, value = option.split("=", 1)
+        for convert in (int, float):
+            try:
+                value = convert(value)
+                break
+            except ValueError:
+                pass
+        engine[key] = value
+    return engine
+
+
+def random_opening(size, plies, rng):
+    """Random distinct stones within two cells of the center, WHITE first."""
+    center = size // 2
+    cells = [(i, j) for i in range(center - 2, center + 3) for j in range(center - 2, center + 3)
+             if 0 <= i < size and 0 <= j < size]
+    return rng.sample(cells, min(plies, len(cells)))
+
+
+def play_game(index, size, engines, a_color, opening, max_plies=None, game_options=None):
+    """Play one game; engines is (engine_a, engine_b), a_color is A's color."""
+    from gomoku.game import Game
+    from gomoku.ordering import MoveOrdering
+    game = Game(size, **(game_options or {}))
+    color = WHITE
+    for i, j in opening:
+        game.make_move(i, j, color)
+        color = BLACK if color == WHITE else WHITE
+    players = {a_color: ("A", engines[0]), (BLACK if a_color == WHITE else WHITE): ("B", engines[1])}
+    stats = {"A": {"moves": 0, "time": 0.0, "nodes": 0}, "B": {"moves": 0, "time": 0.0, "nodes": 0}}
+    # each engine keeps its own transposition table, move ordering (history
+    # and killers) and Monte Carlo tree; root scores are kept per color already
+    searchers = {name: {"tt": None, "mcts": None,
+                        "ordering": MoveOrdering(size) if game.ordering is not None else None}
+                 for name in ("A", "B")}
+    max_plies = max_plies or size * size
+    while game.winner == EMPTY and not game.is_draw() and len(game.history) < max_plies:
+        name, engine = players[color]
+        options = {key: value for key, value in engine.items() if key != "ai_type"}
+        game.nodes = 0
+        for key, value in searchers[name].items():
+            setattr(game, key, value)
+        start = time.perf_counter()
+        game.ai_move(engine["ai_type"], color, **options)
+        stats[name]["time"] += time.perf_counter() - start
+        for key in searchers[name]:
+            searchers[name][key] = getattr(game, key)
+        stats[name]["nodes"] += game.nodes
+        stats[name]["moves"] += 1
+        color = BLACK if color == WHITE else WHITE
+    winner = players[game.winner][0] if game.winner != EMPTY else None
+    return {
+        "game": index,
+        "size": size,
+        "a_color": "white" if a_color == WHITE else "black",
+        "winner": winner,
+        "plies": len(game.history),
+        "opening_plies": len(opening),
+        "moves": [[i, j] for i, j, _, _ in game.history],
+        "engines": {"A": engines[0], "B": engines[1]},
+        "stats": stats,
+    }
+
+
+def elo_difference(wins, draws, losses):
+    """Elo difference of A over B and its 95% interval half-width."""
+    n = wins + draws + losses
+    if n == 0:
+        return 0.0, math.inf
+    score = (wins + 0.5 * draws) / n
+    if score in (0, 1):
+        return math.copysign(math.inf, score - 0.5), math.inf
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n
+
+    def elo(s):
+        s = min(max(s, 1e-3), 1 - 1e-3)
+        return 400 * math.log10(s / (1 - s))
+
+    margin = 1.96 * math.sqrt(variance / n)
+    return elo(score), (elo(score + margin) - elo(score - margin)) / 2
+
+
+def summarize(results):
+    wins = sum(r["winner"] == "A" for r in results)
+    losses = sum(r["winner"] == "B" for r in results)
+    draws = len(results) - wins - losses
+    elo, error = elo_difference(wins, draws, losses)
+    lines = [f"games {len(results)}: A wins {wins}, draws {draws}, B wins {losses}",
+             f"Elo A - B: {elo:+.1f} +/- {error:.1f} (95%)"]
+    for name in ("A", "B"):
+        moves = sum(r["stats"][name]["moves"] for r in results)
+        seconds = sum(r["stats"][name]["time"] for r in results)
+        nodes = sum(r["stats"][name]["nodes"] for r in results)
+        lines.append(f"{name}: {seconds / max(moves, 1):.3f} s/move, "
+                     f"{nodes / max(moves, 1):,.0f} nodes/move, "
+                     f"{nodes / max(seconds, 1e-9):,.0f} nodes/s")
+    return "\n".join(lines)
+
+
+def run_tournament(games, size, engine_a, engine_b, workers=None, out=None,
+                   opening_plies=4, max_plies=None, seed=0, game_options=None, records=None):
+    rng = random.Random(seed)
+    jobs = []
+    for index in range(0, games, 2):
+        opening = random_opening(size, opening_plies, rng)
+        jobs.append((index, WHITE, opening))
+        if index + 1 < games:
+            jobs.append((index + 1, BLACK, opening))
+
+    results = []
+    sink = open(out, "a") if out else None
+    try:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(play_game, index, size, (engine_a, engine_b), a_color,
+                                   opening, max_plies, game_options)
+                       for index, a_color, opening in jobs]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if sink:
+                    sink.write(json.dumps(result) + "\n")
+                    sink.flush()
+                if records:
+                    write_records(records, [GameRecord.from_result(result)])
+    finally:
+        if sink:
+            sink.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Gomoku self-play tournament")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--size", type=int, default=15)
+    parser.add_argument("--engine-a", default="alpha-beta,depth=2")
+    parser.add_argument("--engine-b", default="alpha-beta,depth=1")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all CPUs)")
+    parser.add_argument("--out", help="append one JSON line per game to this file")
+    parser.add_argument("--records", help="append every game to this .gmkr record file")
+    parser.add_argument("--opening-plies", type=int, default=4)
+    parser.add_argument("--max-plies", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    game_options = {"backend": "bitboard", "incremental_eval": True}
+    results = run_tournament(args.games, args.size, parse_engine(args.engine_a),
+                             parse_engine(args.engine_b), args.workers, args.out,
+                             args.opening_plies, args.max_plies, args.seed, game_options,
+                             args.records)
+    print(summarize(results))
+
+
+if __name__ == "__main__":
+    main()
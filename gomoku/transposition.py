@@ -0,0 +1,74 @@
+"""Fixed-size transposition table for the alpha-beta search."""
+import numpy as np
+
+# bound type of a stored score
+EXACT = 0
+LOWER = 1  # the score is a lower bound (the search failed high)
+UPPER = 2  # the score is an upper bound (the search failed low)
+
+NO_MOVE = -1
+
+ENTRY_DTYPE = np.dtype([
+    ("key", np.uint64),
+    ("score", np.int32),
+    ("move", np.int32),
+    ("depth", np.int8),
+    ("flag", np.int8),
+    ("age", np.uint8),
+])
+
+
+class TranspositionTable:
+    """Two-slot buckets: slot 0 is depth-preferred, slot 1 always-replace.
+
+    The table is allocated once from ``size_mb``, so its memory stays fixed no
+    matter how long the game runs. Entries written by an earlier search (see
+    new_search) may be overwritten in slot 0 even by shallower results, so the
+    table does not fill up with stale deep entries from previous moves.
+    """
+
+    def __init__(self, size_mb=16):
+        self.buckets = max(1, int(size_mb * 2**20) // (2 * ENTRY_DTYPE.itemsize))
+        self.keys = np.zeros((self.buckets, 2), dtype=np.uint64)
+        self.scores = np.zeros((self.buckets, 2), dtype=np.int32)
+        self.moves = np.full((self.buckets, 2), NO_MOVE, dtype=np.int32)
+        self.depths = np.full((self.buckets, 2), -1, dtype=np.int8)
+        self.flags = np.zeros((self.buckets, 2), dtype=np.int8)
+        self.ages = np.zeros((self.buckets, 2), dtype=np.uint8)
+        self.age = 0
+
+    @property
+    def nbytes(self):
+        return (self.keys.nbytes + self.scores.nbytes + self.moves.nbytes +
+                self.depths.nbytes + self.flags.nbytes + self.ages.nbytes)
+
+    def new_search(self):
+        self.age = (self.age + 1) % 256
+
+    def clear(self):
+        self.keys[:] = 0
+        self.depths[:] = -1
+        self.moves[:] = NO_MOVE
+
+    def probe(self, key):
+        """Return (depth, score, flag, move) stored for key, or None."""
+        b = key % self.buckets
+        for slot in (0, 1):
+            if self.depths[b, slot] >= 0 and self.keys[b, slot] == key:
+                return (int(self.depths[b, slot]), int(self.scores[b, slot]),
+                        int(self.flags[b, slot]), int(self.moves[b, slot]))
+        return None
+
+    def store(self, key, depth, score, flag, move=NO_MOVE):
+        b = key % self.buckets
+        if (self.keys[b, 0] == key or depth >= self.depths[b, 0]
+                or self.ages[b, 0] != self.age):
+            slot = 0
+        else:
+            slot = 1
+        self.keys[b, slot] = key
+        self.scores[b, slot] = score
+        self.moves[b, slot] = move
+        self.depths[b, slot] = depth
+        self.flags[b, slot] = flag
+        self.ages[b, slot] = self.age
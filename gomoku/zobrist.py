@@ -0,0 +1,56 @@
+"""Zobrist keys for incremental position hashing."""
+from functools import lru_cache
+
+import numpy as np
+
+# fixed seed so hashes (and anything stored under them) are stable across runs
+SEED = 20240611
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(size):
+    """Return ``(cell_keys, extra_keys)`` for a size x size board.
+
+    cell_keys[i * size + j][color] is the 64-bit key of a stone of color on
+    (i, j) (index EMPTY is 0). extra_keys are spare keys for search state that
+    is not on the board, such as the side to move.
+    """
+    rng = np.random.default_rng(SEED + size)
+    keys = rng.integers(0, 2**64, size=(size * size + 1, 3), dtype=np.uint64).tolist()
+    cell_keys = [(0, white, black) for _, white, black in keys[:-1]]
+    return cell_keys, tuple(keys[-1])
+
+
+class SparseCellKeys:
+    """cell_keys of zobrist_keys for boards too large to draw every key up front.
+
+    The key of a cell is derived from its index by the splitmix64 mixer on
+    first use and then cached, so only cells that were played get keys.
+    """
+
+    def __init__(self, seed=SEED):
+        self.seed = seed
+        self.keys = {}
+
+    def __getitem__(self, cell):
+        keys = self.keys.get(cell)
+        if keys is None:
+            keys = self.keys[cell] = (0, splitmix64(self.seed ^ (2 * cell + 1)),
+                                      splitmix64(self.seed ^ (2 * cell + 2)))
+        return keys
+
+
+def splitmix64(x):
+    mask = (1 << 64) - 1
+    x = (x + 0x9E3779B97F4A7C15) & mask
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & mask
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & mask
+    return x ^ (x >> 31)
+
+
+@lru_cache(maxsize=None)
+def sparse_zobrist_keys(size):
+    """zobrist_keys for a sparse board: lazily derived cell keys, same layout."""
+    rng = np.random.default_rng(SEED + size)
+    extra_keys = tuple(rng.integers(0, 2**64, size=3, dtype=np.uint64).tolist())
+    return SparseCellKeys(SEED + size), extra_keys
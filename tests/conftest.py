@@ -0,0 +1,28 @@
+import random
+
+import pytest
+
+from gomoku.constants import EMPTY, WHITE, BLACK
+
+
+def play_random(seed, plies, *games):
+    """Play up to plies random candidate moves, WHITE first, on every one of
+    games alike (they start from the same position); a move that makes five
+    is taken back and ends the game early. Returns the color to move."""
+    rng = random.Random(seed)
+    color = WHITE
+    for _ in range(plies):
+        i, j = rng.choice(games[0].get_all_valid_moves())
+        for game in games:
+            game.make_move(i, j, color)
+        if games[0].winner != EMPTY:
+            for game in games:
+                game.undo_move()
+            break
+        color = BLACK if color == WHITE else WHITE
+    return color
+
+
+@pytest.fixture(name="play_random")
+def play_random_fixture():
+    return play_random
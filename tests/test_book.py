@@ -0,0 +1,38 @@
+"""Opening books (user-013) built from tournament results, either from the
+JSON lines or from the matching .gmkr game records (user-021)."""
+import json
+
+from gomoku.book import BookBuilder
+from gomoku.records import read_records
+from gomoku.tournament import run_tournament
+
+ENGINE = {"ai_type": "alpha-beta", "depth": 1, "threat_search": False, "use_book": False}
+
+
+def test_records_and_results_make_the_same_book(tmp_path):
+    out, records = tmp_path / "games.jsonl", tmp_path / "games.gmkr"
+    run_tournament(4, 9, ENGINE, ENGINE, workers=1, out=str(out), records=str(records),
+                   opening_plies=3, seed=1)
+    from_results, from_records = BookBuilder(9, max_ply=8), BookBuilder(9, max_ply=8)
+    with open(out) as f:
+        for line in f:
+            from_results.add_record(json.loads(line))
+    for record in read_records(str(records)):
+        from_records.add_game_record(record)
+    assert from_results.counts
+    assert from_records.counts == from_results.counts
+
+
+def test_unfinished_games_are_left_out(tmp_path):
+    out, records = tmp_path / "games.jsonl", tmp_path / "games.gmkr"
+    # stopped after 8 plies, none of the games has a result
+    results = run_tournament(2, 9, ENGINE, ENGINE, workers=1, out=str(out), records=str(records),
+                             opening_plies=3, max_plies=8, seed=1)
+    assert all(result["winner"] is None for result in results)
+    builder = BookBuilder(9, max_ply=8)
+    with open(out) as f:
+        for line in f:
+            builder.add_record(json.loads(line))
+    for record in read_records(str(records)):
+        builder.add_game_record(record)
+    assert builder.counts == {}
@@ -0,0 +1,86 @@
+"""make/undo_move against full-board scans on every backend: the winner and
+empty counter (user-001), the candidate frontier (user-005) and the
+incremental evaluation (user-007)."""
+import random
+
+import pytest
+
+from gomoku.constants import EMPTY, WHITE, BLACK
+from gomoku.evaluation import evaluate_patterns, to_color_score
+from gomoku.game import Game
+
+BACKENDS = ["matrix", "bitboard", "sparse"]
+
+
+def frontier(game, radius):
+    """Empty cells within radius of a stone, found by scanning the board."""
+    stones = [(i, j) for i in range(game.size) for j in range(game.size)
+              if game.board.get(i, j) != EMPTY]
+    if not stones:
+        return [(game.size // 2, game.size // 2)]
+    return sorted({(x, y) for i, j in stones
+                   for x in range(max(i - radius, 0), min(i + radius + 1, game.size))
+                   for y in range(max(j - radius, 0), min(j + radius + 1, game.size))
+                   if game.board.get(x, y) == EMPTY})
+
+
+def check(game, radius):
+    assert game.is_winner(WHITE) == game.scan_winner(WHITE)
+    assert game.is_winner(BLACK) == game.scan_winner(BLACK)
+    assert game.empty_count == sum(game.board.get(i, j) == EMPTY
+                                   for i in range(game.size) for j in range(game.size))
+    assert game.get_all_valid_moves() == frontier(game, radius)
+    assert game.evaluate(WHITE) == evaluate_patterns(game.matrix, WHITE)
+    assert game.evaluate(BLACK) == to_color_score(game.eval_total, BLACK)
+
+
+def random_walk(game, rng, steps):
+    """Random make/undo sequence that takes back a five or a full board."""
+    color = WHITE
+    for _ in range(steps):
+        moves = game.get_all_valid_moves()
+        if game.history and (game.winner != EMPTY or not moves or rng.random() < 0.3):
+            color = game.history[-1][2]
+            game.undo_move()
+        else:
+            i, j = rng.choice(moves)
+            game.make_move(i, j, color)
+            color = BLACK if color == WHITE else WHITE
+        yield
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("size, radius", [(7, 1), (9, 2), (15, 2)])
+def test_make_undo_matches_full_scans(backend, size, radius):
+    rng = random.Random(size * 10 + radius)
+    game = Game(size, backend=backend, radius=radius, incremental_eval=True, book=False)
+    for _ in random_walk(game, rng, 200):
+        check(game, radius)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_undo_restores_the_position(play_random, backend):
+    game = Game(9, backend=backend, incremental_eval=True, book=False)
+    color = play_random(1, 12, game)
+    before = (game.hash, game.eval_total, game.empty_count, game.winner,
+              game.get_all_valid_moves(), list(game.history))
+    cells = [(i, j) for i in range(9) for j in range(9) if game.board.get(i, j) == EMPTY]
+    for i, j in cells:
+        game.make_move(i, j, color)
+        game.undo_move()
+    assert (game.hash, game.eval_total, game.empty_count, game.winner,
+            game.get_all_valid_moves(), list(game.history)) == before
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_five_is_detected_from_the_last_move(backend):
+    game = Game(9, backend=backend, book=False)
+    # white fills a diagonal, black plays elsewhere
+    for k in range(4):
+        game.make_move(k + 2, k + 2, WHITE)
+        game.make_move(0, k, BLACK)
+    assert game.winner == EMPTY
+    game.make_move(6, 6, WHITE)
+    assert game.winner == WHITE and game.scan_winner(WHITE)
+    game.undo_move()
+    assert game.winner == EMPTY and not game.scan_winner(WHITE)
@@ -0,0 +1,89 @@
+"""Monte Carlo tree search (user-023): the batched playouts against a plain
+replay of the same fill orders, and moves from Game.ai_move."""
+import numpy as np
+import pytest
+
+from gomoku.constants import EMPTY, WHITE, BLACK
+from gomoku.game import Game
+from gomoku.mcts import MCTS
+
+# more than 127 empty cells, so the move numbers need int16
+SIZE = 13
+# WHITE has four in the top row, (0, 4) makes five
+FOUR = [(0, 0, WHITE), (4, 4, BLACK), (0, 1, WHITE), (5, 5, BLACK), (0, 2, WHITE),
+        (6, 6, BLACK), (0, 3, WHITE), (3, 7, BLACK)]
+
+
+def makes_five(cells, i, j, color):
+    for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        count = 1
+        for sign in (1, -1):
+            k, l = i + sign * di, j + sign * dj
+            while 0 <= k < SIZE and 0 <= l < SIZE and cells[k][l] == color:
+                count += 1
+                k, l = k + sign * di, l + sign * dj
+        if count >= 5:
+            return True
+    return False
+
+
+def replay(game, color, seed, batch):
+    """(white wins, black wins) of playing out the fill orders of random playouts one by one."""
+    start = np.ascontiguousarray(game.matrix).ravel()
+    empty = np.flatnonzero(start == EMPTY)
+    keys = np.random.default_rng(seed).random((batch, len(empty)))
+    wins = {WHITE: 0, BLACK: 0}
+    for playout in range(batch):
+        cells = start.reshape(SIZE, SIZE).tolist()
+        mover = color
+        for cell in empty[np.argsort(keys[playout])]:
+            i, j = divmod(int(cell), SIZE)
+            cells[i][j] = mover
+            if makes_five(cells, i, j, mover):
+                wins[mover] += 1
+                break
+            mover = BLACK if mover == WHITE else WHITE
+    return wins[WHITE], wins[BLACK]
+
+
+def four_game():
+    game = Game(SIZE, book=False)
+    for i, j, color in FOUR:
+        game.make_move(i, j, color)
+    return game
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_playouts_match_a_replay(play_random, seed):
+    random_game = Game(SIZE, book=False)
+    color = play_random(seed, 10 + 10 * seed, random_game)
+    for game, to_move in ((random_game, color), (four_game(), WHITE), (four_game(), BLACK)):
+        mcts = MCTS(SIZE, batch=32, playout="random", seed=seed)
+        assert mcts.playouts_from(game, to_move) == replay(game, to_move, seed, 32)
+
+
+def test_the_last_cell_makes_five():
+    # a full 5x5 board without a five, but for WHITE's top row
+    rows = ["WWWW.", "BBBBW", "WWWWB", "BBBBW", "WWWWB"]
+    game = Game(5, book=False)
+    for i, row in enumerate(rows):
+        for j, stone in enumerate(row):
+            if stone != ".":
+                game.make_move(i, j, WHITE if stone == "W" else BLACK)
+    assert game.winner == EMPTY
+    mcts = MCTS(5, batch=16, seed=0)
+    assert mcts.playouts_from(game, WHITE) == (16, 0)
+    assert mcts.playouts_from(game, BLACK) == (0, 0)
+
+
+def test_ai_move_plays_a_legal_move(play_random):
+    game = Game(SIZE, book=False)
+    color = play_random(3, 12, game)
+    before = len(game.history)
+    i, j = game.ai_move("mcts", color, playouts=2000)
+    assert len(game.history) == before + 1 and game.history[-1][:3] == (i, j, color)
+    assert 0 <= i < SIZE and 0 <= j < SIZE
+    game.undo_move()
+    assert (i, j) in game.get_all_valid_moves()
+    game = four_game()
+    assert game.ai_move("mcts", WHITE, playouts=2000) == (0, 4)
@@ -0,0 +1,62 @@
+"""The searches agree: minimax, alpha-beta and principal variation search
+(user-015), serial and root-parallel over a process pool (user-008), pick
+the same move at the same depth."""
+import pytest
+
+from gomoku.game import Game
+from gomoku.ordering import MoveOrdering
+from gomoku.parallel import shutdown_pools
+
+# the solver and the book would answer some positions before the search
+OPTIONS = {"depth": 2, "threat_search": False, "use_book": False}
+
+
+def position(play_random, seed):
+    """(compact_state, color to move) of a random 9x9 position without a five."""
+    game = Game(9, backend="bitboard", incremental_eval=True, book=False)
+    color = play_random(seed, 2 + seed % 9, game)
+    return game.compact_state(), color
+
+
+@pytest.fixture(scope="module", autouse=True)
+def pools():
+    yield
+    shutdown_pools()
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_searches_pick_the_same_move(play_random, seed):
+    state, color = position(play_random, seed)
+    expected = Game.from_state(state).ai_move("alpha-beta", color, **OPTIONS)
+    for ai_type, workers in [("minimax", None), ("pvs", None), ("alpha-beta", 2), ("pvs", 2)]:
+        game = Game.from_state(state)
+        assert game.ai_move(ai_type, color, workers=workers, **OPTIONS) == expected, (ai_type, workers)
+
+
+@pytest.mark.parametrize("seed", range(4, 7))
+def test_search_tables_keep_the_move(play_random, seed):
+    # ai_move plays its move; taken back, the position is searched again with
+    # the transposition table, history and root scores of the first search
+    state, color = position(play_random, seed)
+    expected = Game.from_state(state).ai_move("alpha-beta", color, **OPTIONS)
+    for ai_type in ("alpha-beta", "pvs"):
+        game = Game.from_state(state)
+        assert game.ai_move(ai_type, color, **OPTIONS) == expected
+        game.undo_move()
+        assert game.ai_move(ai_type, color, **OPTIONS) == expected
+
+
+@pytest.mark.parametrize("seed", [0, 7, 9])
+def test_quiescence_scores_stay_out_of_plain_searches(play_random, seed):
+    # the table filled by a search with quiescence (user-025) is reused by
+    # one without; only the history and root scores are reset
+    game = Game(9, backend="bitboard", incremental_eval=True, book=False)
+    color = play_random(seed, 4 + seed % 7, game)
+    state = game.compact_state()
+    options = {**OPTIONS, "depth": 3}
+    expected = Game.from_state(state).ai_move("pvs", color, **options)
+    game.ai_move("pvs", color, quiescence=2, **options)
+    game.undo_move()
+    game.root_scores = {}
+    game.ordering = MoveOrdering(9)
+    assert game.ai_move("pvs", color, **options) == expected
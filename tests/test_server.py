@@ -0,0 +1,76 @@
+"""The line protocol of gomoku.server (user-022), one session on stdin/stdout."""
+import io
+import time
+
+from gomoku.constants import EMPTY, WHITE, BLACK
+from gomoku.server import ABOUT, Session, serve_stdio
+
+ENGINE = {"ai_type": "alpha-beta", "depth": 1, "threat_search": False, "use_book": False}
+# a short budget per move (ms) instead of TIMEOUT_TURN
+TURN = "INFO timeout_turn 300"
+
+
+def run(*lines):
+    stdout = io.StringIO()
+    session = serve_stdio(ENGINE, stdin=io.StringIO("".join(line + "\n" for line in (TURN,) + lines)),
+                          stdout=stdout)
+    return session, stdout.getvalue().splitlines()
+
+
+def move(reply, size=15):
+    x, y = (int(v) for v in reply.split(","))
+    assert 0 <= x < size and 0 <= y < size
+    return y, x
+
+
+def send(session, line):
+    """The replies to one line, as serve_stdio writes them."""
+    replies, move_due = session.handle(line)
+    if move_due:
+        replies.append(session.think(time.perf_counter()))
+    return replies
+
+
+def test_moves_and_takeback():
+    session = Session(ENGINE)
+    assert send(session, TURN) == []
+    assert send(session, "ABOUT") == [ABOUT]
+    assert send(session, "START 15") == ["OK"]
+    [reply] = send(session, "BEGIN")
+    first = move(reply)
+    [reply] = send(session, "TURN 0,0")
+    second = move(reply)
+    # only the last move can be taken back: the engine's reply, then the opponent's 0,0
+    assert send(session, "TAKEBACK 0,0") == ["ERROR cannot take back 0,0"]
+    assert send(session, f"TAKEBACK {reply}") == ["OK"]
+    assert send(session, "TAKEBACK 0,0") == ["OK"]
+    assert send(session, "TAKEBACK 0,0") == ["ERROR cannot take back 0,0"]
+    assert send(session, f"TAKEBACK {first[1]},{first[0]}") == ["OK"]
+    assert send(session, "TAKEBACK 7,7") == ["ERROR cannot take back 7,7"]
+    assert not session.game.history
+    [reply] = send(session, "TURN 14,14")
+    history = [entry[:3] for entry in session.game.history]
+    assert history == [(14, 14, BLACK), (*move(reply), WHITE)]
+    assert session.game.board.get(*second) == EMPTY
+
+
+def test_errors():
+    session, replies = run("TURN 7,7", "START 40", "START 15", "TURN 7,7", "TURN 7,7",
+                           "TAKEBACK 1,1", "TAKEBACK 99,0", "FOO", "END", "ABOUT")
+    assert replies[:3] == ["ERROR TURN before START", "ERROR unsupported size 40", "OK"]
+    reply = move(replies[3])
+    assert reply != (7, 7)
+    assert replies[4:] == ["ERROR invalid move 7,7", "ERROR cannot take back 1,1",
+                           "ERROR cannot take back 99,0", "UNKNOWN FOO"]
+    # nothing is read after END
+    assert session.ended
+
+
+def test_board():
+    session, replies = run("START 15", "BOARD", "7,7,2", "8,7,1", "7,8,2", "DONE")
+    assert replies[0] == "OK" and len(replies) == 2
+    i, j = move(replies[1])
+    game = session.game
+    assert game.board.get(7, 7) == BLACK and game.board.get(7, 8) == WHITE
+    assert game.board.get(8, 7) == BLACK
+    assert game.history[-1][:3] == (i, j, WHITE)
@@ -0,0 +1,61 @@
+"""The sparse backend (user-024) plays like the bitboard one on a bounded
+board and keeps working away from the center of an unbounded one."""
+import pytest
+
+from gomoku.constants import EMPTY, WHITE, BLACK
+from gomoku.game import Game
+
+OPTIONS = {"depth": 2, "threat_search": False, "use_book": False}
+
+
+def both(size):
+    return (Game(size, backend="sparse", book=False),
+            Game(size, backend="bitboard", incremental_eval=True, book=False))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sparse_matches_bitboard(play_random, seed):
+    sparse, dense = both(15)
+    play_random(seed, 40, sparse, dense)
+    while True:
+        assert sparse.winner == dense.winner
+        assert sparse.get_all_valid_moves() == dense.get_all_valid_moves()
+        assert sparse.evaluate(WHITE) == dense.evaluate(WHITE)
+        if not dense.history:
+            break
+        sparse.undo_move()
+        dense.undo_move()
+    assert sparse.hash == 0 and sparse.eval_total == 0
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_sparse_search_matches_bitboard(play_random, seed):
+    sparse, dense = both(11)
+    color = play_random(seed, 3 + 2 * seed, sparse, dense)
+    assert sparse.ai_move("pvs", color, **OPTIONS) == dense.ai_move("pvs", color, **OPTIONS)
+
+
+def test_unbounded_board():
+    game = Game(None, backend="sparse", book=False)
+    center = game.size // 2
+    assert game.get_all_valid_moves() == [(center, center)]
+    # a five far from the center, along an anti-diagonal
+    for k in range(4):
+        game.make_move(100 + k, 9000 - k, BLACK)
+        game.make_move(center, center + k, WHITE)
+    assert game.winner == EMPTY
+    game.make_move(104, 8996, BLACK)
+    assert game.winner == BLACK and game.scan_winner(BLACK)
+    game.undo_move()
+    move = game.ai_move("pvs", BLACK, **OPTIONS)
+    assert game.winner == BLACK and move in [(104, 8996), (99, 9001)]
+
+
+def test_quiescence_on_an_unbounded_board():
+    # forcing moves are scored cell by cell, never through a dense matrix
+    game = Game(None, backend="sparse", ordering=None, book=False)
+    color = WHITE
+    for _ in range(3):
+        i, j = game.ai_move("pvs", color, quiescence=2, **OPTIONS)
+        assert game.history[-1][:3] == (i, j, color)
+        color = BLACK if color == WHITE else WHITE
@@ -0,0 +1,19 @@
+"""The threat solver (user-012) leaves the game as it found it, also when
+its node budget runs out in the middle of a sequence."""
+import pytest
+
+from gomoku.game import Game
+from gomoku.threats import ThreatSolver
+
+
+@pytest.mark.parametrize("backend", ["matrix", "bitboard", "sparse"])
+def test_solver_restores_the_board(play_random, backend):
+    for seed in range(40):
+        game = Game(11, backend=backend, book=False)
+        color = play_random(seed, 6 + seed % 25, game)
+        before = ([[game.board.get(i, j) for j in range(11)] for i in range(11)],
+                  game.hash, list(game.history))
+        for max_nodes in (1, 5, 50, 2000):
+            ThreatSolver(game, max_nodes, threes=True).solve(color)
+            assert ([[game.board.get(i, j) for j in range(11)] for i in range(11)],
+                    game.hash, list(game.history)) == before